@@ -1,154 +1,502 @@
-import requests
 import aiohttp
-import aiofiles
 import asyncio
-from typing import List, Dict, Any, Optional
+import hashlib
+import orjson
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Callable, List, Dict, Any, Optional, Tuple
+from yarl import URL
 from models import CivitaiModel, CivitaiModelVersion, SearchRequest
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 1 MiB chunks keep per-chunk Python and syscall overhead negligible on multi-GB files
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# Minimum interval between progress callback invocations (seconds)
+PROGRESS_INTERVAL = 0.25
+# Threads for download file I/O, kept apart from the default executor used by the rest of the app
+DOWNLOAD_IO_THREADS = 4
+# Model and version metadata rarely changes, so responses are reused for a while
+METADATA_CACHE_TTL = 600
+METADATA_CACHE_SIZE = 512
+# Clients are cached per API token; a handful of users share one instance
+CLIENT_CACHE_SIZE = 64
+# Downloads smaller than this are read in one go instead of streamed chunk by chunk
+SMALL_DOWNLOAD_SIZE = 64 << 20
+# Downloads at least this large are fetched as parallel Range requests when the server supports it
+PARALLEL_DOWNLOAD_SIZE = 256 << 20
+PARALLEL_DOWNLOAD_PARTS = 8
+# Parallel parts are written to a separate file since a preallocated file's size says nothing about progress
+RANGES_SUFFIX = ".ranges"
+
+
+class TTLCache:
+    """Small in-memory cache with per-entry expiry and LRU eviction."""
+
+    def __init__(self, max_size: int = METADATA_CACHE_SIZE, ttl: float = METADATA_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Any) -> Optional[Any]:
+        """Return the cached value or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Any, value: Any):
+        """Store a value, evicting the least recently used entries beyond max_size."""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries."""
+        self._entries.clear()
+
+
+def _write_all(file_path: str, data: bytes, hasher=None) -> None:
+    """Write a complete in-memory download to file_path."""
+    with open(file_path, 'wb') as f:
+        f.write(data)
+    if hasher is not None:
+        hasher.update(data)
+
+
+def _hash_file(file_path: str, hasher) -> None:
+    """Feed the contents of file_path to hasher."""
+    with open(file_path, 'rb') as f:
+        while block := f.read(DOWNLOAD_CHUNK_SIZE):
+            hasher.update(block)
+
+
+def _preallocate(file_path: str, size: int) -> None:
+    """Create file_path with the given size so parts can be written at their offsets.
+
+    Where supported, the blocks are reserved up front so the filesystem can lay
+    the file out contiguously instead of allocating on every write.
+    """
+    with open(file_path, 'wb') as f:
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+                return
+            except OSError:
+                # Filesystem does not support it, fall back to a sparse file
+                pass
+        f.truncate(size)
+
+
+def _write_chunk(fd: int, chunk: bytes, offset: int, hasher=None) -> None:
+    """Write chunk to fd at offset, feeding it to hasher so verifying a download needs no second read."""
+    view = memoryview(chunk)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+    if hasher is not None:
+        hasher.update(chunk)
+
+
+class _DownloadProgress:
+    """Counts downloaded bytes and reports them at most every PROGRESS_INTERVAL seconds."""
+
+    def __init__(self, callback: Optional[Callable[[int, int], None]], total_size: int):
+        self.callback = callback
+        self.total_size = total_size
+        self.downloaded_size = 0
+        self._next_report_time = 0.0
+
+    def add(self, size: int):
+        self.downloaded_size += size
+        if self.callback and (now := time.monotonic()) >= self._next_report_time:
+            self._next_report_time = now + PROGRESS_INTERVAL
+            self.report()
+
+    def report(self):
+        """Call the progress callback with the current state."""
+        if self.callback:
+            try:
+                self.callback(self.downloaded_size, self.total_size)
+            except Exception as e:
+                logger.warning(f"Progress callback error: {e}")
+
+
+# Each chunk write is one short job on this pool instead of a thread held for a whole transfer,
+# so parallel downloads share a few threads and leave the default executor to the rest of the app
+_download_io_pool = ThreadPoolExecutor(max_workers=DOWNLOAD_IO_THREADS, thread_name_prefix="download-io")
+
+
+async def _wait_for(job: Future):
+    """Wait until a download I/O job has finished, even if the waiting task is cancelled meanwhile.
+
+    The cancellation is re-raised once the job is done, so a file is never closed, removed or
+    reopened by the caller while a worker thread is still writing to it.
+    """
+    waiter = asyncio.wrap_future(job)
+    cancelled = False
+    while not waiter.done():
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            cancelled = True
+    if cancelled:
+        raise asyncio.CancelledError
+    return waiter.result()
+
+
+async def _run_io(func, *args):
+    """Run blocking download file I/O on the download I/O pool"""
+    return await _wait_for(_download_io_pool.submit(func, *args))
+
+
+def _close_after(fd: int, write: Optional[Future]) -> None:
+    """Close fd once its last write has finished, so the descriptor is never reused under a running write."""
+    if write is not None:
+        # A write that has not started yet is dropped instead of waiting for a free worker
+        write.cancel()
+        wait([write])
+    os.close(fd)
+
+
+async def _stream_to_file(response: aiohttp.ClientResponse, file_path: str, progress: _DownloadProgress,
+                          offset: int = 0, truncate: bool = True, hasher=None) -> int:
+    """Stream a response body to file_path starting at offset, returning the bytes received.
+
+    Writing one chunk overlaps with receiving the next.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | (os.O_TRUNC if truncate else 0)
+    opening = _download_io_pool.submit(os.open, file_path, flags, 0o644)
+    try:
+        fd = await _wait_for(opening)
+    except asyncio.CancelledError:
+        if opening.exception() is None:
+            _download_io_pool.submit(os.close, opening.result())
+        raise
+    # Bind hot-loop lookups to locals once
+    submit = _download_io_pool.submit
+    add_progress = progress.add
+    write = None
+    received = 0
+    try:
+        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+            if write is not None:
+                await _wait_for(write)
+            write = submit(_write_chunk, fd, chunk, offset + received, hasher)
+            size = len(chunk)
+            received += size
+            add_progress(size)
+        if write is not None:
+            await _wait_for(write)
+    finally:
+        await _run_io(_close_after, fd, write)
+    return received
+
 
 class CivitaiClient:
     BASE_URL = "https://civitai.com/api/v1"
 
+    # Increase timeouts for large files
+    TIMEOUT = aiohttp.ClientTimeout(
+        total=None,  # No total timeout for large files
+        connect=60,  # 60 seconds to connect
+        sock_read=60  # 60 seconds between reads
+    )
+
+    # One aiohttp session shared by all client instances so that repeated
+    # downloads reuse pooled keep-alive connections instead of paying a new
+    # TCP + TLS handshake each time. Auth headers are passed per request.
+    _session: Optional[aiohttp.ClientSession] = None
+    _session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # Shared response caches, keyed by API token and Civitai id since what a
+    # response contains (NSFW, early access, 404s) depends on the token
+    _model_cache = TTLCache()
+    _version_cache = TTLCache()
+
     def __init__(self, api_token: Optional[str] = None):
         self.api_token = api_token
-        self.session = requests.Session()
-        if api_token:
-            self.session.headers.update(
-                {"Authorization": f"Bearer {api_token}"})
+        self.headers = {"Authorization": f"Bearer {api_token}"} if api_token else {}
 
-    def search_models(self, search_request: SearchRequest) -> Dict[str, Any]:
-        """Search for models using the Civitai API"""
+    @classmethod
+    async def _get_session(cls) -> aiohttp.ClientSession:
+        """Return the shared aiohttp session, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        session = cls._session
+        if session is not None and not session.closed and cls._session_loop is loop:
+            return session
+
+        # Replace the session before awaiting anything, so concurrent callers share the new one
+        stale_session, stale_loop = session, cls._session_loop
+        session = cls._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=10,
+                ttl_dns_cache=300,
+                enable_cleanup_closed=True
+            ),
+            timeout=cls.TIMEOUT
+        )
+        cls._session_loop = loop
+        if stale_session is not None and not stale_session.closed:
+            await cls._close_stale_session(stale_session, stale_loop)
+        return session
+
+    @staticmethod
+    async def _close_stale_session(session: aiohttp.ClientSession, session_loop: asyncio.AbstractEventLoop):
+        """Close a session created on another event loop"""
+        if session_loop.is_running():
+            try:
+                # Requests may still be in flight on that loop, so close the session there
+                asyncio.run_coroutine_threadsafe(session.close(), session_loop)
+                return
+            except RuntimeError:
+                # The loop was closed in the meantime
+                pass
+        await session.close()
+
+    @classmethod
+    def clear_cache(cls):
+        """Drop all cached model and version responses"""
+        cls._model_cache.clear()
+        cls._version_cache.clear()
+
+    @classmethod
+    async def close_session(cls):
+        """Close the shared aiohttp session (called on application shutdown)"""
+        if cls._session is not None and not cls._session.closed:
+            await cls._session.close()
+        cls._session = None
+        cls._session_loop = None
+
+    async def _get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """GET a Civitai API endpoint on the shared session and decode the JSON body"""
+        session = await self._get_session()
+        async with session.get(url, params=params, headers=self.headers) as response:
+            response.raise_for_status()
+            return await response.json(loads=orjson.loads)
+
+    @staticmethod
+    def _build_search_params(search_request: SearchRequest) -> Dict[str, Any]:
+        """Build the query parameters for a model search"""
         params = {
             "limit": search_request.limit,
             "sort": search_request.sort,
             "period": search_request.period
         }
 
-        # CivitAI API doesn't allow 'page' parameter when using 'query'
-        # For query searches, use cursor-based pagination instead
         if search_request.query:
             params["query"] = search_request.query
-            # Use cursor-based pagination for query searches
-            if search_request.cursor:
-                params["cursor"] = search_request.cursor
-            # Don't include page parameter for query searches
-        else:
-            # Only include page parameter for non-query searches
-            params["page"] = search_request.page
+
+        # Cursor-based pagination continues after the previous page instead of
+        # skipping over all earlier results like 'page' offsets do
+        if search_request.cursor:
+            params["cursor"] = search_request.cursor
 
         if search_request.types:
             # Handle both string and ModelType enum values
-            params["types"] = [t.value if hasattr(
-                t, 'value') else t for t in search_request.types]
+            params["types"] = [getattr(t, 'value', t) for t in search_request.types]
 
         if search_request.nsfw is not None:
-            params["nsfw"] = search_request.nsfw
+            # Query strings cannot carry booleans directly
+            params["nsfw"] = "true" if search_request.nsfw else "false"
+
+        return params
+
+    async def search_models(self, search_request: SearchRequest) -> Dict[str, Any]:
+        """Search for models using the Civitai API"""
+        params = self._build_search_params(search_request)
 
         try:
-            response = self.session.get(
-                f"{self.BASE_URL}/models", params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return await self._get_json(f"{self.BASE_URL}/models", params=params)
+        except aiohttp.ClientError as e:
             logger.error(f"Error searching models: {e}")
             raise
 
-    def get_model(self, civitai_model_id: int) -> Dict[str, Any]:
+    async def get_model(self, civitai_model_id: int) -> Dict[str, Any]:
         """Get detailed information about a specific model"""
+        model_data = self._model_cache.get((self.api_token, civitai_model_id))
+        if model_data is not None:
+            return model_data
+
         try:
-            response = self.session.get(f"{self.BASE_URL}/models/{civitai_model_id}")
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            model_data = await self._get_json(f"{self.BASE_URL}/models/{civitai_model_id}")
+            self._model_cache.set((self.api_token, civitai_model_id), model_data)
+            return model_data
+        except aiohttp.ClientError as e:
             logger.error(f"Error fetching model {civitai_model_id}: {e}")
             raise
 
-    def get_model_version(self, version_id: int) -> Dict[str, Any]:
-        """Get detailed information about a specific model version"""
+    async def _get_version_entry(self, version_id: int) -> Tuple[Dict[str, Any], Dict[int, Dict[str, Any]]]:
+        """Get a model version together with its files indexed by file id"""
+        entry = self._version_cache.get((self.api_token, version_id))
+        if entry is not None:
+            return entry
         try:
-            response = self.session.get(
-                f"{self.BASE_URL}/model-versions/{version_id}")
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            version_data = await self._get_json(f"{self.BASE_URL}/model-versions/{version_id}")
+        except aiohttp.ClientError as e:
             logger.error(f"Error fetching model version {version_id}: {e}")
             raise
+        entry = (version_data, {f["id"]: f for f in version_data.get("files", [])})
+        self._version_cache.set((self.api_token, version_id), entry)
+        return entry
 
-    def get_download_url(self, civitai_model_id: int, version_id: int, file_id: int) -> str:
+    async def get_model_version(self, version_id: int) -> Dict[str, Any]:
+        """Get detailed information about a specific model version"""
+        version_data, _ = await self._get_version_entry(version_id)
+        return version_data
+
+    async def get_version_file(self, version_id: int, file_id: int) -> Dict[str, Any]:
+        """Get the file info for a specific file of a model version"""
+        _, files_by_id = await self._get_version_entry(version_id)
+        try:
+            return files_by_id[file_id]
+        except KeyError:
+            raise ValueError(f"File {file_id} not found in version {version_id}")
+
+    async def get_download_url(self, civitai_model_id: int, version_id: int, file_id: int) -> str:
         """Get the download URL for a specific model file"""
-        # The download URL is typically provided in the model version details
-        # For direct download, we use the file's downloadUrl from the model data
-        version_data = self.get_model_version(version_id)
+        # The download URL is provided in the file info of the model version details
+        file_info = await self.get_version_file(version_id, file_id)
+        return file_info["downloadUrl"]
 
-        for file_info in version_data.get("files", []):
-            if file_info["id"] == file_id:
-                return file_info["downloadUrl"]
+    async def _download_ranges(self, session: aiohttp.ClientSession, url: URL, file_path: str,
+                               headers: Dict[str, str], progress: _DownloadProgress):
+        """Download url as concurrent Range requests, each part written at its own file offset
 
-        raise ValueError(f"File {file_id} not found in version {version_id}")
+        The parts go to file_path + RANGES_SUFFIX, which only replaces file_path once every part
+        has arrived, so file_path never holds a preallocated file that could be resumed by size.
+        """
+        total_size = progress.total_size
+        part_size = -(-total_size // PARALLEL_DOWNLOAD_PARTS)
+        ranges_path = file_path + RANGES_SUFFIX
+        await _run_io(_preallocate, ranges_path, total_size)
 
-    def download_file_stream(self, download_url: str, api_token: Optional[str] = None):
-        """Download a file and return the streaming response"""
-        headers = {}
-        if api_token:
-            headers["Authorization"] = f"Bearer {api_token}"
+        async def fetch(start: int, end: int):
+            range_headers = {**headers, "Range": f"bytes={start}-{end}"}
+            async with session.get(url, headers=range_headers) as response:
+                response.raise_for_status()
+                if response.status != 206:
+                    raise aiohttp.ClientPayloadError(
+                        f"Server ignored range request for bytes {start}-{end}")
+                received = await _stream_to_file(response, ranges_path, progress, start, truncate=False)
+            if received != end - start + 1:
+                raise aiohttp.ClientPayloadError(
+                    f"Incomplete range bytes {start}-{end}: received {received} bytes")
 
+        logger.info(f"Downloading {file_path} in {-(-total_size // part_size)} parallel parts")
         try:
-            response = requests.get(download_url, headers=headers, stream=True)
-            response.raise_for_status()
-            return response
-        except requests.RequestException as e:
-            logger.error(f"Error downloading file from {download_url}: {e}")
+            async with asyncio.TaskGroup() as parts:
+                for start in range(0, total_size, part_size):
+                    parts.create_task(fetch(start, min(start + part_size, total_size) - 1))
+        except BaseException as e:
+            # The task group has waited for every part, and each part for its writes and its
+            # file to be closed, so nothing writes to the file any more
+            try:
+                os.remove(ranges_path)
+            except OSError:
+                pass
+            if isinstance(e, ExceptionGroup):
+                # Surface the first failure like a single-stream download would
+                raise e.exceptions[0]
             raise
+        os.replace(ranges_path, file_path)
 
     async def download_file_async(self, download_url: str, file_path: str,
-                                  progress_callback=None, api_token: Optional[str] = None):
-        """Download a file asynchronously with progress tracking and better timeout handling"""
+                                  progress_callback=None, api_token: Optional[str] = None,
+                                  resume: bool = False, sha256: Optional[str] = None):
+        """Download a file asynchronously with progress tracking and better timeout handling
+
+        With resume, an existing partial file at file_path is continued with a Range request.
+        With sha256, the file is hashed while it is written and removed if the hash does not match.
+        """
         headers = {}
         if api_token:
             headers["Authorization"] = f"Bearer {api_token}"
 
-        # Increase timeouts for large files
-        timeout = aiohttp.ClientTimeout(
-            total=None,  # No total timeout for large files
-            connect=60,  # 60 seconds to connect
-            sock_read=60  # 60 seconds between reads
-        )
+        existing_size = 0
+        if resume:
+            try:
+                existing_size = os.path.getsize(file_path)
+            except OSError:
+                pass
+        request_headers = {**headers, "Range": f"bytes={existing_size}-"} if existing_size else headers
+
+        hasher = hashlib.sha256() if sha256 else None
+        # Set for downloads that are not written in order and therefore hashed after the fact
+        hash_after_download = False
 
         try:
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(download_url, headers=headers) as response:
+            session = await self._get_session()
+            ranged_url = None
+            async with session.get(download_url, headers=request_headers) as response:
+                if (existing_size and response.status == 416
+                        and response.headers.get('Content-Range') == f"bytes */{existing_size}"):
+                    # The partial file already holds the whole body
+                    progress = _DownloadProgress(progress_callback, existing_size)
+                    progress.downloaded_size = existing_size
+                    hash_after_download = True
+                else:
                     response.raise_for_status()
 
                     total_size = int(response.headers.get('content-length', 0))
-                    downloaded_size = 0
-                    chunk_size = 32768  # Increased chunk size for better performance
+                    # 206 continues the existing file; 200 means the server ignored Range and we start over
+                    resumed = bool(existing_size) and response.status == 206
+                    if resumed and total_size:
+                        total_size += existing_size
+                    progress = _DownloadProgress(progress_callback, total_size)
 
                     logger.info(f"Starting download: {file_path}, Total size: {total_size} bytes")
 
-                    # Use aiofiles for async file writing
-                    async with aiofiles.open(file_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(chunk_size):
-                            await f.write(chunk)
-                            downloaded_size += len(chunk)
+                    if resumed:
+                        logger.info(f"Resuming download of {file_path} at {existing_size} bytes")
+                        progress.downloaded_size = existing_size
+                        if hasher:
+                            await _run_io(_hash_file, file_path, hasher)
+                        await _stream_to_file(response, file_path, progress, existing_size,
+                                              truncate=False, hasher=hasher)
+                    elif 0 < total_size < SMALL_DOWNLOAD_SIZE:
+                        # Small bodies fit in memory: one read and one write, no per-chunk overhead
+                        data = await response.read()
+                        await _run_io(_write_all, file_path, data, hasher)
+                        progress.downloaded_size = len(data)
+                    elif total_size >= PARALLEL_DOWNLOAD_SIZE and response.headers.get('Accept-Ranges') == 'bytes':
+                        # Leave this body unread and fetch the final (post-redirect) URL in parallel parts
+                        ranged_url = response.url
+                        hash_after_download = True
+                    else:
+                        await _stream_to_file(response, file_path, progress, hasher=hasher)
+
+            if ranged_url is not None:
+                # Only send credentials to the host they were meant for
+                range_headers = headers if ranged_url.origin() == URL(download_url).origin() else {}
+                await self._download_ranges(session, ranged_url, file_path, range_headers, progress)
 
-                            # Call progress callback if provided
-                            if progress_callback:
-                                try:
-                                    progress_callback(
-                                        downloaded_size, total_size)
-                                except Exception as e:
-                                    logger.warning(
-                                        f"Progress callback error: {e}")
+            if hasher:
+                if hash_after_download:
+                    await _run_io(_hash_file, file_path, hasher)
+                if hasher.hexdigest() != sha256.lower():
+                    # A corrupt file must not be resumed later
+                    os.remove(file_path)
+                    raise ValueError(
+                        f"SHA256 mismatch for {file_path}: expected {sha256.lower()}, got {hasher.hexdigest()}")
 
-                            # Yield control less frequently for better performance
-                            if downloaded_size % (chunk_size * 5) == 0:  # Every ~160KB
-                                await asyncio.sleep(0.001)
+            # Report the final state which the throttle may have skipped
+            progress.report()
 
-                    logger.info(f"Download completed: {file_path}, Downloaded: {downloaded_size} bytes")
-                    return downloaded_size
+            logger.info(f"Download completed: {file_path}, Downloaded: {progress.downloaded_size} bytes")
+            return progress.downloaded_size
 
         except asyncio.TimeoutError as e:
             logger.error(f"Download timeout for {download_url}: {e}")
@@ -160,3 +508,9 @@ class CivitaiClient:
         except Exception as e:
             logger.error(f"Unexpected error downloading file from {download_url}: {e}")
             raise
+
+
+@lru_cache(maxsize=CLIENT_CACHE_SIZE)
+def get_client(api_token: Optional[str] = None) -> CivitaiClient:
+    """Return the shared CivitaiClient for an API token instead of building one per request"""
+    return CivitaiClient(api_token)
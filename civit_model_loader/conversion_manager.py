@@ -3,27 +3,80 @@ import asyncio
 import uuid
 import tempfile
 import zipfile
-import glob
 import shutil
 import subprocess
-from typing import Dict, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
 from pathlib import Path
 import logging
 from datetime import datetime
 import time
+from collections import OrderedDict
 from models import ConversionInfo, ConversionStatus, ConversionRequest
-from converter import convert_invokeai_to_a1111
+from converter import convert_invokeai_to_a1111, convert_invokeai_to_a1111_bytes
 
 logger = logging.getLogger(__name__)
 
+# Finished conversions beyond this count are forgotten, least recently used first
+MAX_TRACKED_CONVERSIONS = 10_000
+# Converted images buffered between the conversion workers and the ZIP writer thread
+ZIP_QUEUE_SIZE = 16
+# Buffer size for copying staged files into the ZIP
+ZIP_COPY_BUFFER_SIZE = 1 << 20
+
+
+def _write_zip_entries(zip_path: str, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop) -> None:
+    """Write (arc_name, source) entries from an asyncio queue to a new ZIP until a None sentinel arrives.
+
+    source is either the entry content as bytes or the Path of a file to add.
+    Runs in a worker thread so ZIP writes overlap with the ongoing conversions.
+    """
+    def next_entry():
+        return asyncio.run_coroutine_threadsafe(queue.get(), loop).result()
+
+    try:
+        # PNG data is already deflate-compressed, so store entries without recompressing
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zipf:
+            while True:
+                entry = next_entry()
+                if entry is None:
+                    return
+                arc_name, source = entry
+                if isinstance(source, bytes):
+                    zipf.writestr(arc_name, source)
+                else:
+                    # Stream files from disk in large blocks instead of zipfile's 8 KiB copies.
+                    # from_file records the size, so ZIP64 headers are only written for huge files.
+                    zinfo = zipfile.ZipInfo.from_file(source, arc_name)
+                    with open(source, 'rb') as src, zipf.open(zinfo, 'w') as dest:
+                        shutil.copyfileobj(src, dest, ZIP_COPY_BUFFER_SIZE)
+    except BaseException:
+        # Keep draining so the producer never blocks on a full queue
+        while next_entry() is not None:
+            pass
+        raise
+
 
 class ConversionManager:
-    def __init__(self, mount_dir: str = "/workspace"):
+    def __init__(self, mount_dir: str = "/workspace", max_conversions: int = MAX_TRACKED_CONVERSIONS):
         self.mount_dir = mount_dir
-        self.conversions: Dict[str, ConversionInfo] = {}
+        self.max_conversions = max_conversions
+        self.conversions: "OrderedDict[str, ConversionInfo]" = OrderedDict()
         self.active_conversions: Dict[str, asyncio.Task] = {}
+        # PNG metadata conversion is CPU-bound Python, so run it on all cores
+        self._pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+    def shutdown(self):
+        """Stop the conversion worker processes"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def convert_file(self, png_file: str) -> Tuple[bool, str, bytes]:
+        """Convert the metadata of a single image in memory in the worker processes"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool, convert_invokeai_to_a1111_bytes, png_file, self.mount_dir)
 
-    def add_conversion(self, request: ConversionRequest) -> str:
+    async def add_conversion(self, request: ConversionRequest) -> str:
         """Add a new conversion to the queue"""
         conversion_id = str(uuid.uuid4())
 
@@ -34,9 +87,10 @@ class ConversionManager:
         if not os.path.isdir(request.directory):
             raise ValueError(f"Path is not a directory: {request.directory}")
 
-        # Find all PNG files in the directory
-        png_pattern = os.path.join(request.directory, "*.png")
-        png_files = glob.glob(png_pattern)
+        # Find all PNG files in the directory, reusing the type info from the directory listing
+        with os.scandir(request.directory) as entries:
+            png_files = [entry.path for entry in entries
+                         if entry.name.endswith('.png') and entry.is_file()]
 
         if not png_files:
             raise ValueError(f"No PNG files found in directory: {request.directory}")
@@ -46,10 +100,12 @@ class ConversionManager:
             directory=request.directory,
             status=ConversionStatus.PENDING,
             total_files=len(png_files),
-            start_time=datetime.now().isoformat()
+            start_time=datetime.now().isoformat(),
+            start_ts=time.time()
         )
 
         self.conversions[conversion_id] = conversion_info
+        await self._evict_conversions()
 
         # Start conversion in background
         task = asyncio.create_task(
@@ -67,91 +123,102 @@ class ConversionManager:
 
             logger.info(f"Starting conversion for {conversion_id}: {len(png_files)} files (auto_sort={auto_sort})")
 
-            # Create temporary directory for converted files
+            # Create temporary directory for the ZIP file
             temp_dir = tempfile.mkdtemp()
+            zip_filename = f"converted_images_{Path(conversion_info.directory).name}_{conversion_id[:8]}.zip"
+            zip_path = os.path.join(temp_dir, zip_filename)
+            # The sort script works on files, so converted images are only staged on disk for auto-sort
+            staging_dir = os.path.join(temp_dir, "converted") if auto_sort else None
             converted_files = []
             conversion_errors = []
 
             try:
-                # Convert each PNG file
-                for i, png_file in enumerate(png_files):
+                loop = asyncio.get_running_loop()
+
+                async def convert(png_file: str, file_name: str, output_filename: str):
+                    png_data = None
                     try:
-                        conversion_info.current_file = os.path.basename(
-                            png_file)
-                        conversion_info.processed_files = i
-                        conversion_info.progress = (i / len(png_files)) * 100
+                        # Convert the image metadata - use /workspace for config/cache files
+                        if staging_dir:
+                            success, message = await loop.run_in_executor(
+                                self._pool, convert_invokeai_to_a1111, png_file,
+                                os.path.join(staging_dir, output_filename), self.mount_dir)
+                        else:
+                            success, message, png_data = await loop.run_in_executor(
+                                self._pool, convert_invokeai_to_a1111_bytes, png_file, self.mount_dir)
+                    except Exception as e:
+                        success, message = False, str(e)
+                    return png_file, file_name, output_filename, success, message, png_data
 
-                        # Generate output filename
-                        base_name = Path(png_file).stem
-                        output_filename = f"{base_name}_a1111.png"
-                        output_path = os.path.join(temp_dir, output_filename)
+                if staging_dir:
+                    os.makedirs(staging_dir)
 
-                        # Convert the image metadata - use /workspace for config/cache files
-                        success, message = convert_invokeai_to_a1111(
-                            png_file, output_path, self.mount_dir)
+                # Converted images are handed to a ZIP writer thread as they finish
+                queue: asyncio.Queue = asyncio.Queue(maxsize=ZIP_QUEUE_SIZE)
+                writer = asyncio.ensure_future(asyncio.to_thread(
+                    _write_zip_entries, zip_path, queue, loop))
+                conversions = []
+                try:
+                    # Derive every name once up front instead of per result
+                    jobs = []
+                    for png_file in png_files:
+                        file_name = os.path.basename(png_file)
+                        jobs.append((png_file, file_name, f"{os.path.splitext(file_name)[0]}_a1111.png"))
+
+                    # Convert all PNG files in parallel, collecting results as they finish
+                    conversions = [asyncio.ensure_future(convert(*job)) for job in jobs]
+                    for i, next_done in enumerate(asyncio.as_completed(conversions)):
+                        png_file, file_name, output_filename, success, message, png_data = await next_done
+
+                        conversion_info.current_file = file_name
+                        conversion_info.processed_files = i + 1
+                        conversion_info.progress = ((i + 1) / len(png_files)) * 100
 
                         if success:
-                            converted_files.append(
-                                (output_path, output_filename))
+                            # Without auto-sort, converted images go straight into the ZIP
+                            if png_data is not None:
+                                await queue.put((output_filename, png_data))
+                            converted_files.append(output_filename)
                             logger.info(
                                 f"Converted: {png_file} -> {output_filename}")
                         else:
                             conversion_errors.append(
-                                f"{os.path.basename(png_file)}: {message}")
+                                f"{file_name}: {message}")
                             logger.warning(f"Failed to convert {png_file}: {message}")
 
-                        # Yield control periodically
-                        await asyncio.sleep(0.001)
-
-                    except Exception as e:
-                        error_msg = f"{os.path.basename(png_file)}: {str(e)}"
-                        conversion_errors.append(error_msg)
-                        logger.error(f"Error converting {png_file}: {e}")
-
-                # Update final progress
-                conversion_info.processed_files = len(png_files)
-                conversion_info.progress = 100.0
-                conversion_info.current_file = None
+                    # Update final progress
+                    conversion_info.processed_files = len(png_files)
+                    conversion_info.progress = 100.0
+                    conversion_info.current_file = None
+
+                    # Check if we have any converted files
+                    if not converted_files:
+                        if conversion_errors:
+                            error_summary = "; ".join(conversion_errors[:3])
+                            if len(conversion_errors) > 3:
+                                error_summary += f"and {len(conversion_errors) - 3} more errors"
+                            raise Exception(
+                                f"No files could be converted. Errors: {error_summary}")
+                        else:
+                            raise Exception("No files could be converted")
 
-                # Check if we have any converted files
-                if not converted_files:
-                    if conversion_errors:
-                        error_summary = "; ".join(conversion_errors[:3])
-                        if len(conversion_errors) > 3:
-                            error_summary += f"and {len(conversion_errors) - 3} more errors"
-                        raise Exception(
-                            f"No files could be converted. Errors: {error_summary}")
-                    else:
-                        raise Exception("No files could be converted")
-
-                # Auto-sort converted images if requested
-                if auto_sort and converted_files:
-                    logger.info(f"Auto-sorting converted images for {conversion_id}")
-                    try:
-                        await self._sort_images(temp_dir)
-                        logger.info(f"Auto-sort completed for {conversion_id}")
-                    except Exception as sort_error:
-                        logger.warning(f"Auto-sort failed for {conversion_id}: {sort_error}")
-                        # Continue with ZIP creation even if sorting fails
-
-                # Create ZIP file
-                zip_filename = f"converted_images_{Path(conversion_info.directory).name}_{conversion_id[:8]}.zip"
-                zip_path = os.path.join(temp_dir, zip_filename)
-
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    # If auto-sort was enabled, walk the directory tree to include sorted structure
-                    if auto_sort:
-                        for root, dirs, files in os.walk(temp_dir):
+                    if staging_dir:
+                        # Auto-sort converted images
+                        logger.info(f"Auto-sorting converted images for {conversion_id}")
+                        try:
+                            await self._sort_images(staging_dir)
+                            logger.info(f"Auto-sort completed for {conversion_id}")
+                        except Exception as sort_error:
+                            logger.warning(f"Auto-sort failed for {conversion_id}: {sort_error}")
+                            # Continue with ZIP creation even if sorting fails
+
+                        # Walk the staging directory tree to include the sorted structure
+                        for root, dirs, files in os.walk(staging_dir):
                             for file in files:
-                                if file != zip_filename:  # Don't include the zip file itself
-                                    file_path = os.path.join(root, file)
-                                    # Create archive name with relative path from temp_dir
-                                    arc_name = os.path.relpath(file_path, temp_dir)
-                                    zipf.write(file_path, arc_name)
-                    else:
-                        # Original behavior: just add converted files at root level
-                        for file_path, arc_name in converted_files:
-                            zipf.write(file_path, arc_name)
+                                file_path = os.path.join(root, file)
+                                # Create archive name with relative path from staging_dir
+                                arc_name = os.path.relpath(file_path, staging_dir)
+                                await queue.put((arc_name, Path(file_path)))
 
                     # Add a summary file if there were errors
                     if conversion_errors:
@@ -160,12 +227,17 @@ class ConversionManager:
                         summary_content += f"Failed conversions: {len(conversion_errors)} files\n\n"
                         summary_content += "Errors:\n" + \
                             "\n".join(conversion_errors)
-
-                        summary_path = os.path.join(
-                            temp_dir, "conversion_summary.txt")
-                        with open(summary_path, 'w') as f:
-                            f.write(summary_content)
-                        zipf.write(summary_path, "conversion_summary.txt")
+                        await queue.put(("conversion_summary.txt", summary_content.encode()))
+                finally:
+                    # On cancellation or error, drop conversions still queued in the process pool
+                    for conversion in conversions:
+                        conversion.cancel()
+                    await queue.put(None)
+                    await writer
+
+                # The staged images are in the ZIP now
+                if staging_dir:
+                    await asyncio.to_thread(shutil.rmtree, staging_dir, ignore_errors=True)
 
                 # Update conversion info with download URL
                 conversion_info.status = ConversionStatus.COMPLETED
@@ -177,12 +249,9 @@ class ConversionManager:
 
                 logger.info(f"Conversion completed: {conversion_id} - {len(converted_files)} files converted")
 
-            except Exception as e:
-                # Clean up temp directory on error
-                try:
-                    shutil.rmtree(temp_dir)
-                except Exception:
-                    pass
+            except BaseException:
+                # Clean up temp directory on error or cancellation
+                await asyncio.to_thread(shutil.rmtree, temp_dir, ignore_errors=True)
                 raise
 
         except asyncio.CancelledError:
@@ -225,9 +294,39 @@ class ConversionManager:
         
         logger.info(f"Sort script output: {stdout.decode()}")
 
+    async def _evict_conversions(self):
+        """Forget least recently used finished conversions beyond max_conversions"""
+        excess = len(self.conversions) - self.max_conversions
+        if excess <= 0:
+            return
+
+        # Running conversions still update their entry, so only finished ones are evicted
+        evict = []
+        for conversion_id, conversion_info in self.conversions.items():
+            if conversion_info.status in (ConversionStatus.COMPLETED, ConversionStatus.FAILED):
+                evict.append(conversion_id)
+                if len(evict) == excess:
+                    break
+
+        evicted = [(conversion_id, self.conversions.pop(conversion_id)) for conversion_id in evict]
+        for conversion_id, conversion_info in evicted:
+            await self._remove_conversion_files(conversion_id, conversion_info)
+            logger.info(f"Evicted conversion: {conversion_id}")
+
+    async def _remove_conversion_files(self, conversion_id: str, conversion_info: ConversionInfo):
+        """Delete the temporary directory holding a conversion's ZIP file"""
+        if hasattr(conversion_info, '_zip_path') and conversion_info._zip_path:
+            # Deleting many files can take a while, so keep it off the event loop
+            await asyncio.to_thread(
+                shutil.rmtree, os.path.dirname(conversion_info._zip_path), ignore_errors=True)
+            logger.info(f"Cleaned up conversion files for {conversion_id}")
+
     def get_conversion_status(self, conversion_id: str) -> Optional[ConversionInfo]:
         """Get the status of a specific conversion"""
-        return self.conversions.get(conversion_id)
+        conversion_info = self.conversions.get(conversion_id)
+        if conversion_info is not None:
+            self.conversions.move_to_end(conversion_id)
+        return conversion_info
 
     def get_all_conversions(self) -> Dict[str, ConversionInfo]:
         """Get status of all conversions"""
@@ -247,30 +346,18 @@ class ConversionManager:
             return True
         return False
 
-    def cleanup_old_conversions(self, max_age_hours: int = 24):
+    async def cleanup_old_conversions(self, max_age_hours: int = 24):
         """Clean up old completed conversions and their files"""
-        cutoff_time = datetime.now().timestamp() - (max_age_hours * 3600)
+        cutoff_time = time.time() - (max_age_hours * 3600)
 
         to_remove = []
         for conversion_id, conversion_info in self.conversions.items():
-            if conversion_info.start_time:
-                start_time = datetime.fromisoformat(
-                    conversion_info.start_time).timestamp()
-                if start_time < cutoff_time and conversion_info.status in [ConversionStatus.COMPLETED, ConversionStatus.FAILED]:
-                    to_remove.append(conversion_id)
-
-                    # Clean up ZIP file if it exists
-                    if hasattr(conversion_info, '_zip_path') and conversion_info._zip_path:
-                        try:
-                            zip_dir = os.path.dirname(
-                                conversion_info._zip_path)
-                            if os.path.exists(zip_dir):
-                                shutil.rmtree(zip_dir)
-                                logger.info(f"Cleaned up conversion files for {conversion_id}")
-                        except Exception as e:
-                            logger.warning(f"Failed to clean up files for {conversion_id}: {e}")
+            if conversion_info.start_ts and conversion_info.start_ts < cutoff_time and conversion_info.status in [ConversionStatus.COMPLETED, ConversionStatus.FAILED]:
+                to_remove.append(conversion_id)
 
+        # Entries are removed before awaiting so the dict is never iterated across an await
         for conversion_id in to_remove:
-            del self.conversions[conversion_id]
+            conversion_info = self.conversions.pop(conversion_id)
+            await self._remove_conversion_files(conversion_id, conversion_info)
             logger.info(f"Removed old conversion: {conversion_id}")
 
@@ -3,10 +3,17 @@ import argparse
 import json
 import hashlib
 import logging
-from   typing import Any
+from   io     import BytesIO
+from   typing import Any, BinaryIO, Union
 from   PIL import Image
 from   PIL.PngImagePlugin import PngInfo
 
+try:
+    import fcntl
+except ImportError:
+    # No file locking on Windows; the cache is still replaced atomically
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -50,11 +57,26 @@ sampler_info = {
 
 def save_model_hash(basename:str, model_hash:str, hash_cache:Any, cache_dir:str = ".") -> None:
     # Save calculated model hash to cache so that it can be quickly recalled later
+    if hash_cache.get(basename) == model_hash:
+        # Already cached, nothing to write
+        return
     hash_cache[basename] = model_hash
     cache_path = os.path.join(cache_dir, "hash_cache.json")
     try:
-        with open(cache_path, "w") as f:
-            f.write(json.dumps(hash_cache, indent=4))
+        # Conversion worker processes share the cache file: merge under a lock and replace
+        # the file atomically, so that no reader ever sees a partially written cache
+        with open(cache_path + ".lock", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(cache_path, "r") as f:
+                    hash_cache.update({**json.load(f), basename: model_hash})
+            except (FileNotFoundError, ValueError):
+                pass
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(json.dumps(hash_cache, indent=4))
+            os.replace(tmp_path, cache_path)
     except PermissionError:
         # If we can't write to the cache directory, just skip saving the cache
         # The conversion will still work, just without persistent hash caching
@@ -100,13 +122,13 @@ def parse_args() -> argparse.Namespace:
     return args
 
 
-def convert_image_metadata(input_file: str, output_file: str, invokeai_cfg: dict = None, hash_cache: dict = None, cache_dir: str = ".") -> tuple[bool, str]:
+def convert_image_metadata(input_file: str, output_file: Union[str, BinaryIO], invokeai_cfg: dict = None, hash_cache: dict = None, cache_dir: str = ".") -> tuple[bool, str]:
     """
     Convert InvokeAI image metadata to Automatic1111 format.
     
     Args:
         input_file: Path to InvokeAI PNG file
-        output_file: Path for converted output file
+        output_file: Path or binary file object for converted output file
         invokeai_cfg: Configuration with model folder paths
         hash_cache: Cache for previously calculated model hashes
         
@@ -200,7 +222,7 @@ def convert_image_metadata(input_file: str, output_file: str, invokeai_cfg: dict
                 logger.info("Model hash is not sha256! Attempting to calculate hash from model file")
                 if 'vae_folder' in invokeai_cfg:
                     model_file=f"{invokeai_cfg['vae_folder']}/{json_data['vae']['name']}.safetensors"
-                    model_hash = calculate_shorthash(model_file, hash_cache, ".")
+                    model_hash = calculate_shorthash(model_file, hash_cache, cache_dir)
                     if model_hash != "NOFILE":
                         meta_vhash = 'VAE hash: ' + model_hash
                     else:
@@ -243,8 +265,10 @@ def convert_image_metadata(input_file: str, output_file: str, invokeai_cfg: dict
         metadata.add_text("parameters", meta_final)
 
         # Save the image with the metadata
-        im_invoke.save(output_file, pnginfo=metadata)
-        return True, f"Converted file saved as: {output_file}"
+        im_invoke.save(output_file, format="PNG", pnginfo=metadata)
+        if isinstance(output_file, str):
+            return True, f"Converted file saved as: {output_file}"
+        return True, f"Converted file {input_file} in memory"
         
     except KeyError as e:
         return False, f"ERROR processing {input_file}: Missing required field {e}. This might indicate an unsupported scheduler or missing metadata."
@@ -252,13 +276,13 @@ def convert_image_metadata(input_file: str, output_file: str, invokeai_cfg: dict
         return False, f"ERROR processing {input_file}: Unexpected error: {type(e).__name__}: {e}"
 
 
-def convert_invokeai_to_a1111(input_file: str, output_file: str, cache_dir: str = None) -> tuple[bool, str]:
+def convert_invokeai_to_a1111(input_file: str, output_file: Union[str, BinaryIO], cache_dir: str = None) -> tuple[bool, str]:
     """
     Simplified wrapper function to convert InvokeAI image to Automatic1111 format.
     
     Args:
         input_file: Path to InvokeAI PNG file
-        output_file: Path for converted output file  
+        output_file: Path or binary file object for converted output file
         cache_dir: Directory for config and cache files. Defaults to /workspace if available, otherwise current directory
         
     Returns:
@@ -296,6 +320,22 @@ def convert_invokeai_to_a1111(input_file: str, output_file: str, cache_dir: str
     return convert_image_metadata(input_file, output_file, invokeai_cfg, hash_cache, cache_dir)
 
 
+def convert_invokeai_to_a1111_bytes(input_file: str, cache_dir: str = None) -> tuple[bool, str, bytes]:
+    """
+    Convert InvokeAI image to Automatic1111 format in memory.
+
+    Args:
+        input_file: Path to InvokeAI PNG file
+        cache_dir: Directory for config and cache files (see convert_invokeai_to_a1111)
+
+    Returns:
+        Tuple of (success: bool, message: str, png_data: bytes); png_data is empty on failure
+    """
+    buffer = BytesIO()
+    success, message = convert_invokeai_to_a1111(input_file, buffer, cache_dir)
+    return success, message, buffer.getvalue() if success else b""
+
+
 def main() -> None:
     # Initialize configuration
     invokeai_cfg = {}
@@ -1,42 +1,90 @@
 import os
 import asyncio
-import uuid
-from typing import Dict, Optional
+import secrets
+from typing import Dict, FrozenSet, Optional, Tuple
 from pathlib import Path
 import logging
 from datetime import datetime
 import time
+from collections import OrderedDict
 from models import DownloadInfo, DownloadStatus, DownloadRequest
-from civitai_client import CivitaiClient
+from civitai_client import get_client
 
 logger = logging.getLogger(__name__)
 
+# Downloads beyond this many wait in PENDING instead of competing for bandwidth
+MAX_PARALLEL_DOWNLOADS = 4
+# Download progress is logged each time another this many bytes have arrived
+PROGRESS_LOG_INTERVAL = 10 * 1024 * 1024
+# Finished downloads beyond this count are forgotten, least recently used first
+MAX_TRACKED_DOWNLOADS = 1024
+# Listings of the models directory are reused for this many seconds
+MODEL_FILES_CACHE_TTL = 5.0
+
+
+def _new_id() -> str:
+    """Create a download id that sorts by creation time"""
+    # Nanosecond timestamp first (UUIDv7 style), random suffix against collisions
+    return f"{time.time_ns():016x}-{secrets.token_hex(4)}"
+
+
+def _drop_page_cache(file_path: Path):
+    """Flush a finished download and drop it from the page cache"""
+    # The server never reads model files again, so caching them only evicts hotter data.
+    # Dirty pages cannot be dropped, hence the flush before the hint.
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        os.fdatasync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
 
 class DownloadManager:
-    def __init__(self, mount_dir: str = "/workspace"):
+    def __init__(self, mount_dir: str = "/workspace", max_parallel_downloads: int = MAX_PARALLEL_DOWNLOADS,
+                 max_downloads: int = MAX_TRACKED_DOWNLOADS):
         self.mount_dir = mount_dir
+        self.max_downloads = max_downloads
         self.models_dir = Path(mount_dir) / "models"
         self.models_dir.mkdir(parents=True, exist_ok=True)
-        self.downloads: Dict[str, DownloadInfo] = {}
+        self.downloads: "OrderedDict[str, DownloadInfo]" = OrderedDict()
         self.active_downloads: Dict[str, asyncio.Task] = {}
-
-    def add_download(self, request: DownloadRequest) -> str:
+        self._download_slots = asyncio.Semaphore(max_parallel_downloads)
+        # Bumped on every change to the tracked downloads, so pollers can tell nothing changed
+        self._revision = 0
+        # Set and replaced on every change, waking up everyone waiting for the next one
+        self._changed = asyncio.Event()
+        # (scan time, file names) of the last models directory listing
+        self._model_files: Optional[Tuple[float, FrozenSet[str]]] = None
+        self._model_files_lock = asyncio.Lock()
+
+    @property
+    def revision(self) -> int:
+        """Revision of the download listing, increasing whenever any download changes"""
+        return self._revision
+
+    def _mark_changed(self):
+        """Record a change to the tracked downloads and wake up waiting listeners"""
+        self._revision += 1
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, revision: int) -> int:
+        """Wait until the listing has moved past the given revision and return the new revision"""
+        while self._revision == revision:
+            await self._changed.wait()
+        return self._revision
+
+    async def add_download(self, request: DownloadRequest) -> str:
         """Add a new download to the queue"""
-        download_id = str(uuid.uuid4())
+        download_id = _new_id()
 
         # Get file info from Civitai
-        client = CivitaiClient(request.api_token)
+        client = get_client(request.api_token)
         try:
-            version_data = client.get_model_version(request.version_id)
-            file_info = None
-
-            for file in version_data.get("files", []):
-                if file["id"] == request.file_id:
-                    file_info = file
-                    break
-
-            if not file_info:
-                raise ValueError(f"File {request.file_id} not found")
+            file_info = await client.get_version_file(request.version_id, request.file_id)
 
             filename = file_info["name"]
             total_size = int(file_info["sizeKB"] * 1024)  # Convert KB to bytes
@@ -53,6 +101,8 @@ class DownloadManager:
             )
 
             self.downloads[download_id] = download_info
+            self._evict_downloads()
+            self._mark_changed()
 
             # Start download in background
             task = asyncio.create_task(
@@ -68,33 +118,42 @@ class DownloadManager:
     async def _download_file(self, download_id: str, request: DownloadRequest):
         """Download a file asynchronously with enhanced error handling and progress tracking"""
         download_info = self.downloads[download_id]
+        slot_acquired = False
+        part_path = None
 
         try:
+            # Wait for a free download slot; queued downloads stay pending
+            await self._download_slots.acquire()
+            slot_acquired = True
             download_info.status = DownloadStatus.DOWNLOADING
+            self._mark_changed()
 
-            client = CivitaiClient(request.api_token)
-            download_url = client.get_download_url(
-                request.civitai_model_id,
-                request.version_id,
-                request.file_id
-            )
+            client = get_client(request.api_token)
+            file_info = await client.get_version_file(request.version_id, request.file_id)
+            download_url = file_info["downloadUrl"]
+            # Civitai publishes file hashes, so downloads are verified while they are written
+            sha256 = (file_info.get("hashes") or {}).get("SHA256")
 
             # Create file path
             file_path = self.models_dir / download_info.filename
             download_info.file_path = str(file_path)
+            # Download next to the target so an interrupted download can be resumed later
+            part_path = self._part_path(file_path)
 
             logger.info(f"Starting download for {download_id}: {download_info.filename}")
 
             # Enhanced progress callback with timing and speed tracking
-            start_time = time.time()
-            last_update_time = start_time
-            last_downloaded_size = 0
+            # Monotonic clock so wall-clock adjustments cannot skew speed and ETA
+            start_time = time.monotonic()
+            last_log_bucket = 0
 
+            # The client already throttles calls to a few per second
             def progress_callback(downloaded_size: int, total_size: int):
-                nonlocal last_update_time, last_downloaded_size
+                nonlocal last_log_bucket
 
-                current_time = time.time()
+                current_time = time.monotonic()
                 download_info.downloaded_size = downloaded_size
+                self._mark_changed()
 
                 # Calculate progress percentage
                 effective_total = total_size or download_info.total_size or 0
@@ -107,22 +166,19 @@ class DownloadManager:
                 # Calculate download speed and ETA
                 elapsed_time = current_time - start_time
                 if elapsed_time > 0 and downloaded_size > 0:
-                    download_info.download_speed = downloaded_size / elapsed_time
+                    speed = downloaded_size / elapsed_time
+                    download_info.download_speed = speed
 
                     # Calculate ETA if we have total size and speed
-                    if effective_total > 0 and download_info.download_speed > 0:
-                        remaining_bytes = effective_total - downloaded_size
+                    if effective_total > 0:
                         download_info.eta_seconds = int(
-                            remaining_bytes / download_info.download_speed)
+                            (effective_total - downloaded_size) / speed)
 
-                # Update tracking for stall detection
-                if downloaded_size > last_downloaded_size:
-                    last_update_time = current_time
-                    last_downloaded_size = downloaded_size
-
-                # Log progress for large downloads
-                # Every 10MB
-                if downloaded_size > 0 and downloaded_size % (1024 * 1024 * 10) == 0:
+                # Log progress for large downloads whenever another PROGRESS_LOG_INTERVAL bytes arrived;
+                # chunk boundaries rarely line up with exact multiples
+                log_bucket = downloaded_size // PROGRESS_LOG_INTERVAL
+                if log_bucket > last_log_bucket:
+                    last_log_bucket = log_bucket
                     speed_mb = (download_info.download_speed or 0) / \
                         (1024 * 1024)
                     eta_str = f"ETA: {download_info.eta_seconds}s" if download_info.eta_seconds else "ETA: unknown"
@@ -131,20 +187,34 @@ class DownloadManager:
             # Download with async I/O - this won't block the event loop
             downloaded_size = await client.download_file_async(
                 download_url,
-                str(file_path),
+                str(part_path),
                 progress_callback=progress_callback,
-                api_token=request.api_token
+                api_token=request.api_token,
+                resume=True,
+                sha256=sha256
             )
 
-            # Verify download completed successfully
-            if file_path.exists() and file_path.stat().st_size > 0:
+            # Verify download completed successfully with a single stat call
+            try:
+                part_size = os.stat(part_path).st_size
+            except FileNotFoundError:
+                part_size = 0
+
+            if part_size > 0:
+                part_path.replace(file_path)
+                self._model_files = None
+                try:
+                    await asyncio.to_thread(_drop_page_cache, file_path)
+                except OSError as e:
+                    logger.warning(f"Failed to drop page cache for {file_path}: {e}")
                 download_info.status = DownloadStatus.COMPLETED
                 download_info.progress = 100.0
                 download_info.downloaded_size = downloaded_size
                 download_info.end_time = datetime.now().isoformat()
+                self._mark_changed()
 
                 # Final speed calculation
-                total_time = time.time() - start_time
+                total_time = time.monotonic() - start_time
                 if total_time > 0:
                     download_info.download_speed = downloaded_size / total_time
 
@@ -155,40 +225,81 @@ class DownloadManager:
         except asyncio.CancelledError:
             download_info.status = DownloadStatus.FAILED
             download_info.error_message = "Download was cancelled"
+            self._mark_changed()
             logger.info(f"Download cancelled: {download_id}")
 
             # Clean up partial file
-            if download_info.file_path and Path(download_info.file_path).exists():
+            if part_path:
                 try:
-                    Path(download_info.file_path).unlink()
-                    logger.info(f"Cleaned up partial file: {download_info.file_path}")
+                    part_path.unlink(missing_ok=True)
+                    logger.info(f"Cleaned up partial file: {part_path}")
                 except Exception as cleanup_error:
                     logger.warning(f"Failed to clean up partial file: {cleanup_error}")
 
         except Exception as e:
             download_info.status = DownloadStatus.FAILED
             download_info.error_message = str(e)
+            self._mark_changed()
             logger.error(f"Download failed for {download_id}: {e}")
 
-            # Clean up partial file on error
-            if download_info.file_path and Path(download_info.file_path).exists():
-                try:
-                    file_size = Path(download_info.file_path).stat().st_size
-                    # Less than 90% complete
-                    if file_size < (download_info.total_size or 0) * 0.9:
-                        Path(download_info.file_path).unlink()
-                        logger.info(f"Cleaned up incomplete file: {download_info.file_path}")
-                except Exception as cleanup_error:
-                    logger.warning(f"Failed to clean up incomplete file: {cleanup_error}")
+            # The partial file is kept so downloading the same file again resumes it
+            if part_path:
+                logger.info(f"Keeping partial file for resume: {part_path}")
 
         finally:
+            if slot_acquired:
+                self._download_slots.release()
+
             # Remove from active downloads
             if download_id in self.active_downloads:
                 del self.active_downloads[download_id]
 
+    @staticmethod
+    def _part_path(file_path: Path) -> Path:
+        """Path of the partial file a download is written to before completion"""
+        return file_path.with_name(file_path.name + ".part")
+
+    async def get_model_files(self) -> FrozenSet[str]:
+        """Names of the files in the models directory, rescanned at most every MODEL_FILES_CACHE_TTL seconds"""
+        # Concurrent checks wait for and share one scan instead of each listing the directory
+        async with self._model_files_lock:
+            now = time.monotonic()
+            if self._model_files is None or now - self._model_files[0] > MODEL_FILES_CACHE_TTL:
+                self._model_files = (now, await asyncio.to_thread(self._scan_model_files))
+            return self._model_files[1]
+
+    def _scan_model_files(self) -> FrozenSet[str]:
+        """List the names of the files in the models directory"""
+        try:
+            with os.scandir(self.models_dir) as entries:
+                return frozenset(entry.name for entry in entries if entry.is_file())
+        except FileNotFoundError:
+            return frozenset()
+
+    def _evict_downloads(self):
+        """Forget least recently used finished downloads beyond max_downloads"""
+        excess = len(self.downloads) - self.max_downloads
+        if excess <= 0:
+            return
+
+        # Pending and running downloads still update their entry, so only finished ones are evicted
+        evict = []
+        for download_id, download_info in self.downloads.items():
+            if download_info.status in (DownloadStatus.COMPLETED, DownloadStatus.FAILED):
+                evict.append(download_id)
+                if len(evict) == excess:
+                    break
+
+        for download_id in evict:
+            del self.downloads[download_id]
+            logger.info(f"Evicted download: {download_id}")
+
     def get_download_status(self, download_id: str) -> Optional[DownloadInfo]:
         """Get the status of a specific download"""
-        return self.downloads.get(download_id)
+        download_info = self.downloads.get(download_id)
+        if download_info is not None:
+            self.downloads.move_to_end(download_id)
+        return download_info
 
     def get_all_downloads(self) -> Dict[str, DownloadInfo]:
         """Get status of all downloads"""
@@ -204,6 +315,7 @@ class DownloadManager:
             if download_info:
                 download_info.status = DownloadStatus.FAILED
                 download_info.error_message = "Download cancelled"
+                self._mark_changed()
 
             return True
         return False
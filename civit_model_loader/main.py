@@ -1,88 +1,162 @@
 import os
+import asyncio
 import logging
 import argparse
-import json
-import tempfile
+import orjson
 import zipfile
-import glob
-import shutil
+import gzip
+import hashlib
+import uuid
+from urllib.parse import quote
 from pathlib import Path
-from fastapi import FastAPI, HTTPException, Request, Query
+from typing import Dict, Optional, Set, Type, TypeVar
+from fastapi import FastAPI, HTTPException, Request, Query, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from pydantic import BaseModel
 
-from models import SearchRequest, DownloadRequest, DownloadInfo, ConfigExport, FileExistenceRequest, FileExistenceResponse, FileExistenceStatus, FileInfo, ListFilesResponse, ConversionRequest, ConversionInfo
-from civitai_client import CivitaiClient
+from models import SearchRequest, DownloadRequest, DownloadInfo, ConfigExport, FileExistenceRequest, FileExistenceResponse, ListFilesResponse, ConversionRequest, ConversionInfo
+from civitai_client import CivitaiClient, get_client
 from download_manager import DownloadManager
 from conversion_manager import ConversionManager
-from converter import convert_invokeai_to_a1111
-from thumbnail import get_thumbnail_base64, is_image_file
+from thumbnail import get_thumbnail_base64, get_thumbnail_bytes, is_image_file
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# The environment does not change at runtime, so it is read once
+MOUNT_DIR = os.getenv("MOUNT_DIR", "/workspace")
+
 # Global managers
 download_manager = None
 conversion_manager = None
+# (manager, revision, JSON body) of the last /api/downloads listing, reused until the revision changes
+_downloads_listing = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     global download_manager, conversion_manager
-    mount_dir = os.getenv("MOUNT_DIR", "/workspace")
-    download_manager = DownloadManager(mount_dir)
-    conversion_manager = ConversionManager(mount_dir)
-    logger.info(f"Managers initialized with mount_dir: {mount_dir}")
+    download_manager = DownloadManager(
+        MOUNT_DIR, int(os.getenv("MAX_PARALLEL_DOWNLOADS", "4")))
+    conversion_manager = ConversionManager(MOUNT_DIR)
+    logger.info(f"Managers initialized with mount_dir: {MOUNT_DIR}")
     yield
-    # Shutdown - could add cleanup here if needed
+    # Shutdown
+    await CivitaiClient.close_session()
+    conversion_manager.shutdown()
 
-app = FastAPI(title="Civitai Model Loader", version="1.0.0", lifespan=lifespan)
+# orjson encodes responses to bytes directly and is much faster than the stdlib json encoder
+app = FastAPI(title="Civitai Model Loader", version="1.0.0", lifespan=lifespan,
+              default_response_class=ORJSONResponse)
 
 # Add CORS middleware to handle browser requests properly
+# No cookies are used, so without credentials the wildcard origin is sent as is
+# instead of echoing each request's origin
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, specify your actual origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_credentials=False,
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 
 # Serve static files (frontend)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
+INDEX_HTML = "static/index.html"
+# Polled JSON bodies at least this large are sent gzip-compressed
+GZIP_MIN_SIZE = 1024
+# Fast compression level; the listings are highly repetitive and compress well anyway
+GZIP_LEVEL = 5
+# Minimum time between two download listings pushed over the WebSocket
+DOWNLOADS_PUSH_INTERVAL = 0.5
+# Upper bound on the PNG files converted by one /api/download-converted-images request
+MAX_CONVERT_FILES = int(os.getenv("MAX_CONVERT_FILES", "1000"))
+# Conversions of one such request in flight, each holding a converted image until it is streamed
+CONVERT_WINDOW = (os.cpu_count() or 1) * 2
+# Distinguishes ETags of this process from ones issued before a restart, when counters start over
+BOOT_ID = uuid.uuid4().hex[:12]
+# Thumbnail URLs carry the image version, so their responses never change
+THUMBNAIL_CACHE_CONTROL = "public, max-age=86400, immutable"
+# Directories images may be served from; add other allowed directories as needed
+ALLOWED_IMAGE_ROOTS = [os.path.realpath(allowed_dir) for allowed_dir in ("/workspace", "/tmp")]
+# Media types of the image files served by /api/serve-image
+IMAGE_MEDIA_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.bmp': 'image/bmp',
+    '.tiff': 'image/tiff',
+    '.tif': 'image/tiff'
+}
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the client's If-None-Match header covers the given ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored on both sides
+    candidates = {tag.strip().removeprefix("W/").strip('"') for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/").strip('"') in candidates
+
+
+async def _parse_body(request: Request, model: Type[ModelT]) -> ModelT:
+    """Validate a JSON request body into a Pydantic model"""
+    # The frontend may send JSON as text/plain (CORS fallback), so the content type is not checked.
+    # pydantic-core parses the JSON while validating, without building an intermediate dict.
+    return model.model_validate_json(await request.body())
+
+
+def _gzip_response(request: Request, response: Response) -> Response:
+    """Compress a buffered response body for clients accepting gzip"""
+    # Done per endpoint rather than with GZipMiddleware, which would also recompress
+    # the ZIP archives and images served by the download endpoints
+    response.headers["Vary"] = "Accept-Encoding"
+    if len(response.body) < GZIP_MIN_SIZE or "gzip" not in request.headers.get("accept-encoding", ""):
+        return response
+    response.body = gzip.compress(response.body, compresslevel=GZIP_LEVEL)
+    response.headers["Content-Encoding"] = "gzip"
+    response.headers["Content-Length"] = str(len(response.body))
+    return response
+
+
 @app.get("/", response_class=HTMLResponse)
-async def root():
-    """Serve the main frontend page"""
-    return FileResponse("static/index.html")
+async def root(request: Request):
+    """Serve the main frontend page, answering unchanged repeat requests with 304 Not Modified"""
+    # Browsers revalidate on every load, so frontend updates show up immediately
+    response = FileResponse(INDEX_HTML, stat_result=os.stat(INDEX_HTML),
+                            headers={"Cache-Control": "no-cache"})
+    if _etag_matches(request, response.headers["etag"]):
+        return Response(status_code=304, headers={
+            "ETag": response.headers["etag"],
+            "Cache-Control": "no-cache",
+        })
+    return response
 
 
 @app.post("/api/search")
 async def search_models(request: Request):
     """Search for models on Civitai"""
     try:
-        # Handle both application/json and text/plain content types
-        content_type = request.headers.get("content-type", "")
-
-        if content_type.startswith("text/plain"):
-            # Handle text/plain requests (CORS fallback)
-            body = await request.body()
-            request_data = json.loads(body.decode())
-        else:
-            # Handle normal JSON requests
-            request_data = await request.json()
-
-        # Parse the request data into SearchRequest model
-        search_request = SearchRequest(**request_data)
+        # Parse and validate the request body into SearchRequest in one pass
+        search_request = await _parse_body(request, SearchRequest)
 
         logger.info(f"Received search request: {search_request}")
-        client = CivitaiClient(api_token=search_request.api_token)
-        results = client.search_models(search_request)
-        return results
+        client = get_client(search_request.api_token)
+        results = await client.search_models(search_request)
+        # Civitai's JSON is already plain data, so skip FastAPI's recursive jsonable_encoder
+        return ORJSONResponse(results)
     except Exception as e:
         logger.error(f"Search error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -100,9 +174,9 @@ async def get_model(civitai_model_id: int, request: Request):
             if auth_header and auth_header.startswith("Bearer "):
                 api_token = auth_header[7:]
 
-        client = CivitaiClient(api_token)
-        model_data = client.get_model(civitai_model_id)
-        return model_data
+        client = get_client(api_token)
+        model_data = await client.get_model(civitai_model_id)
+        return ORJSONResponse(model_data)
     except Exception as e:
         logger.error(f"Error fetching model {civitai_model_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -112,9 +186,9 @@ async def get_model(civitai_model_id: int, request: Request):
 async def get_model_version(version_id: int):
     """Get detailed information about a specific model version"""
     try:
-        client = CivitaiClient()
-        version_data = client.get_model_version(version_id)
-        return version_data
+        client = get_client()
+        version_data = await client.get_model_version(version_id)
+        return ORJSONResponse(version_data)
     except Exception as e:
         logger.error(f"Error fetching model version {version_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -124,22 +198,11 @@ async def get_model_version(version_id: int):
 async def start_download(request: Request):
     """Start downloading a model file"""
     try:
-        # Handle both application/json and text/plain content types
-        content_type = request.headers.get("content-type", "")
-
-        if content_type.startswith("text/plain"):
-            # Handle text/plain requests (CORS fallback)
-            body = await request.body()
-            request_data = json.loads(body.decode())
-        else:
-            # Handle normal JSON requests
-            request_data = await request.json()
-
-        # Parse the request data into DownloadRequest model
-        download_request = DownloadRequest(**request_data)
+        # Parse and validate the request body into DownloadRequest in one pass
+        download_request = await _parse_body(request, DownloadRequest)
 
         logger.info(f"Received download request: {download_request}")
-        download_id = download_manager.add_download(download_request)
+        download_id = await download_manager.add_download(download_request)
         return {"download_id": download_id, "status": "started"}
     except Exception as e:
         logger.error(f"Download error: {e}")
@@ -156,9 +219,57 @@ async def get_download_status(download_id: str):
 
 
 @app.get("/api/downloads")
-async def get_all_downloads():
-    """Get status of all downloads"""
-    return download_manager.get_all_downloads()
+async def get_all_downloads(request: Request):
+    """Get status of all downloads, answering polls without changes with 304 Not Modified"""
+    etag = f'W/"{BOOT_ID}-{download_manager.revision}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    response = Response(_downloads_listing_body(), media_type="application/json", headers=headers)
+    return _gzip_response(request, response)
+
+
+@app.websocket("/ws/downloads")
+async def downloads_websocket(websocket: WebSocket):
+    """Push the download listing to the client whenever a download changes"""
+    await websocket.accept()
+    # Nothing is expected from the client, receiving only notices when it goes away
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(websocket))
+    try:
+        while True:
+            revision = download_manager.revision
+            await websocket.send_text(_downloads_listing_body().decode())
+            # Coalesce bursts of progress updates into one message
+            await asyncio.sleep(DOWNLOADS_PUSH_INTERVAL)
+
+            change = asyncio.ensure_future(download_manager.wait_for_change(revision))
+            await asyncio.wait({change, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                change.cancel()
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    """Discard incoming messages until the client disconnects"""
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+def _downloads_listing_body() -> bytes:
+    """JSON body of the download listing, serialized once per revision"""
+    global _downloads_listing
+    if _downloads_listing is None or _downloads_listing[:2] != (download_manager, download_manager.revision):
+        # Polled continuously by the frontend: dump the models directly and encode with orjson
+        # instead of going through FastAPI's generic jsonable_encoder
+        body = orjson.dumps({download_id: download_info.model_dump(mode="json")
+                             for download_id, download_info in download_manager.get_all_downloads().items()})
+        _downloads_listing = (download_manager, download_manager.revision, body)
+    return _downloads_listing[2]
 
 
 @app.delete("/api/downloads/{download_id}")
@@ -175,22 +286,11 @@ async def cancel_download(download_id: str):
 async def start_image_conversion(request: Request):
     """Start converting images asynchronously"""
     try:
-        # Handle both application/json and text/plain content types
-        content_type = request.headers.get("content-type", "")
-
-        if content_type.startswith("text/plain"):
-            # Handle text/plain requests (CORS fallback)
-            body = await request.body()
-            request_data = json.loads(body.decode())
-        else:
-            # Handle normal JSON requests
-            request_data = await request.json()
-
-        # Parse the request data into ConversionRequest model
-        conversion_request = ConversionRequest(**request_data)
+        # Parse and validate the request body into ConversionRequest in one pass
+        conversion_request = await _parse_body(request, ConversionRequest)
 
         logger.info(f"Received conversion request: {conversion_request}")
-        conversion_id = conversion_manager.add_conversion(conversion_request)
+        conversion_id = await conversion_manager.add_conversion(conversion_request)
         return {"conversion_id": conversion_id, "status": "started"}
     except Exception as e:
         logger.error(f"Conversion error: {e}")
@@ -209,7 +309,8 @@ async def get_conversion_status(conversion_id: str):
 @app.get("/api/conversions")
 async def get_all_conversions():
     """Get status of all conversions"""
-    return conversion_manager.get_all_conversions()
+    return ORJSONResponse({conversion_id: conversion_info.model_dump(mode="json")
+                           for conversion_id, conversion_info in conversion_manager.get_all_conversions().items()})
 
 
 @app.delete("/api/conversions/{conversion_id}")
@@ -251,55 +352,96 @@ async def download_conversion_result(conversion_id: str):
     )
 
 
-@app.post("/api/check-files")
+def _list_subdirectories(models_dir: str, subdirectories: Set[str]) -> Dict[str, Set[str]]:
+    """List the file names in each of the given subdirectories of models_dir"""
+    listings = {}
+    for subdirectory in subdirectories:
+        try:
+            with os.scandir(models_dir + os.sep + subdirectory) as entries:
+                listings[subdirectory] = {entry.name for entry in entries if entry.is_file()}
+        except OSError:
+            # Missing, not a directory or unreadable: none of its files count as present
+            listings[subdirectory] = set()
+    return listings
+
+
+@app.post("/api/check-files", response_model=FileExistenceResponse)
 async def check_file_existence(request: Request):
     """Check if downloaded model files actually exist on disk"""
     try:
-        # Handle both application/json and text/plain content types
-        content_type = request.headers.get("content-type", "")
-
-        if content_type.startswith("text/plain"):
-            # Handle text/plain requests (CORS fallback)
-            body = await request.body()
-            request_data = json.loads(body.decode())
-        else:
-            # Handle normal JSON requests
-            request_data = await request.json()
-
-        # Parse the request data into FileExistenceRequest model
-        file_request = FileExistenceRequest(**request_data)
+        # Parse and validate the request body into FileExistenceRequest in one pass
+        file_request = await _parse_body(request, FileExistenceRequest)
 
         logger.info(f"Received file existence check request: {file_request}")
 
         # Handle empty files array
         if not file_request.files:
             logger.info("Empty files array received, returning empty response")
-            return FileExistenceResponse(files=[])
+            return ORJSONResponse({"files": []})
+
+        models_dir = str(download_manager.models_dir)
+        # Plain concatenation also keeps absolute filenames inside the models directory
+        models_dir_prefix = models_dir + os.sep
 
-        mount_dir = os.getenv("MOUNT_DIR", "/workspace")
-        models_dir = os.path.join(mount_dir, "models")
+        # One cached directory listing instead of a stat call per requested file
+        existing_files = await download_manager.get_model_files()
+
+        # Names with subdirectories are not in the top-level listing; list just the
+        # subdirectories the request mentions, off the event loop
+        subdirectories = {os.path.dirname(file_info.filename)
+                          for file_info in file_request.files if os.sep in file_info.filename}
+        if subdirectories:
+            subdirectory_files = await asyncio.to_thread(_list_subdirectories, models_dir, subdirectories)
+        else:
+            subdirectory_files = {}
 
         file_statuses = []
 
         for file_info in file_request.files:
-            file_path = os.path.join(models_dir, file_info.filename)
-            exists = os.path.isfile(file_path)
-
-            file_statuses.append(FileExistenceStatus(
-                civitai_model_id=file_info.civitai_model_id,
-                version_id=file_info.version_id,
-                file_id=file_info.file_id,
-                filename=file_info.filename,
-                exists=exists,
-                file_path=file_path
-            ))
-
-        return FileExistenceResponse(files=file_statuses)
+            file_path = models_dir_prefix + file_info.filename
+            if os.sep in file_info.filename:
+                subdirectory, name = os.path.split(file_info.filename)
+                exists = name in subdirectory_files[subdirectory]
+            else:
+                exists = file_info.filename in existing_files
+
+            # Plain dicts in the shape of FileExistenceStatus, encoded by orjson without
+            # a Pydantic model per file
+            file_statuses.append({
+                "civitai_model_id": file_info.civitai_model_id,
+                "version_id": file_info.version_id,
+                "file_id": file_info.file_id,
+                "filename": file_info.filename,
+                "exists": exists,
+                "file_path": file_path,
+            })
+
+        return ORJSONResponse({"files": file_statuses})
     except Exception as e:
         logger.error(f"File existence check error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class _ZipStreamBuffer:
+    """Write-only file object collecting ZIP output until it is sent to the client"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        """Return and forget everything written since the last call"""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
 @app.get("/api/download-converted-images")
 async def download_converted_images(directory: str = Query(default="/workspace/output/images")):
     """
@@ -309,7 +451,7 @@ async def download_converted_images(directory: str = Query(default="/workspace/o
         directory: Directory to scan for PNG images (default: /workspace/output/images)
 
     Returns:
-        ZIP file containing converted images
+        ZIP file containing converted images, streamed while the images are converted
     """
     try:
         # Validate directory exists
@@ -321,127 +463,136 @@ async def download_converted_images(directory: str = Query(default="/workspace/o
             raise HTTPException(
                 status_code=400, detail=f"Path is not a directory: {directory}")
 
-        # Find all PNG files in the directory
-        png_pattern = os.path.join(directory, "*.png")
-        png_files = glob.glob(png_pattern)
+        # Find all PNG files in the directory, reusing the type info from the directory listing
+        with os.scandir(directory) as entries:
+            png_files = [entry.path for entry in entries
+                         if entry.name.endswith('.png') and entry.is_file()]
 
         if not png_files:
             raise HTTPException(
                 status_code=404, detail=f"No PNG files found in directory: {directory}")
 
+        # Cap the work per request; larger batches belong to background conversions
+        if len(png_files) > MAX_CONVERT_FILES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Too many PNG files ({len(png_files)} > {MAX_CONVERT_FILES}); use /api/start-conversion instead")
+
         logger.info(f"Found {len(png_files)} PNG files in {directory}")
 
-        # Create temporary directory for converted files
-        temp_dir = tempfile.mkdtemp()
-        converted_files = []
+        async def convert(png_file: str):
+            output_filename = f"{Path(png_file).stem}_a1111.png"
+            try:
+                # Convert the image metadata in memory in the conversion worker processes
+                success, message, png_data = await conversion_manager.convert_file(png_file)
+            except Exception as e:
+                logger.error(f"Error converting {png_file}: {e}")
+                success, message, png_data = False, str(e), b""
+            return png_file, output_filename, success, message, png_data
+
+        # Convert PNG files in parallel within a sliding window, handling results as they finish,
+        # so only a bounded number of converted images is held in memory at a time
+        remaining_files = iter(png_files)
+        conversions = set()
+        finished = []
+        converted_count = 0
         conversion_errors = []
 
+        def convert_next():
+            """Start converting the next PNG file, if any"""
+            png_file = next(remaining_files, None)
+            if png_file is not None:
+                conversions.add(asyncio.ensure_future(convert(png_file)))
+
+        for _ in range(CONVERT_WINDOW):
+            convert_next()
+
+        async def next_converted():
+            """Wait for the next successful conversion, recording failures on the way"""
+            nonlocal converted_count
+            while finished or conversions:
+                if not finished:
+                    done, _ = await asyncio.wait(conversions, return_when=asyncio.FIRST_COMPLETED)
+                    conversions.difference_update(done)
+                    finished.extend(done)
+                png_file, output_filename, success, message, png_data = finished.pop().result()
+                if success:
+                    converted_count += 1
+                    logger.info(f"Converted: {png_file} -> {output_filename}")
+                    return output_filename, png_data
+                conversion_errors.append(f"{os.path.basename(png_file)}: {message}")
+                logger.warning(f"Failed to convert {png_file}: {message}")
+                # Nothing is held for a failed image, so its slot is free right away
+                convert_next()
+            return None
+
         try:
-            # Convert each PNG file
-            for png_file in png_files:
-                try:
-                    # Generate output filename
-                    base_name = Path(png_file).stem
-                    output_filename = f"{base_name}_a1111.png"
-                    output_path = os.path.join(temp_dir, output_filename)
-
-                    # Convert the image metadata - use /workspace for config/cache files
-                    success, message = convert_invokeai_to_a1111(
-                        png_file, output_path, "/workspace")
-
-                    if success:
-                        converted_files.append((output_path, output_filename))
-                        logger.info(
-                            f"Converted: {png_file} -> {output_filename}")
-                    else:
-                        conversion_errors.append(
-                            f"{os.path.basename(png_file)}: {message}")
-                        logger.warning(f"Failed to convert "
-                                       f"{png_file}: {message}")
-
-                except Exception as e:
-                    error_msg = f"{os.path.basename(png_file)}: {str(e)}"
-                    conversion_errors.append(error_msg)
-                    logger.error(f"Error converting {png_file}: {e}")
-
-            # Check if we have any converted files
-            if not converted_files:
-                if conversion_errors:
-                    error_summary = "; ".join(
-                        conversion_errors[:3])  # Show first 3 errors
-                    if len(conversion_errors) > 3:
-                        error_summary += f" and " \
-                            f"{len(conversion_errors) - 3} more errors"
-                    raise HTTPException(
-                        status_code=422,
-                        detail=f"No files could be converted. Errors: "
-                        f"{error_summary}"
-                    )
-                else:
-                    raise HTTPException(
-                        status_code=422, detail="No files could be converted")
-
-            # Create ZIP file
-            zip_filename = f"converted_images_{Path(directory).name}.zip"
-            zip_path = os.path.join(temp_dir, zip_filename)
-
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file_path, arc_name in converted_files:
-                    zipf.write(file_path, arc_name)
-
-                # Add a summary file if there were errors
-                if conversion_errors:
-                    summary_content = "Conversion Summary\n" + "=" * 50 + "\n\n"
-                    summary_content += f"Successfully converted: " \
-                        f"{len(converted_files)} files\n"
-                    summary_content += f"Failed conversions: " \
-                        f"{len(conversion_errors)} files\n\n"
-                    summary_content += "Errors:\n" + \
-                        "\n".join(conversion_errors)
-
-                    summary_path = os.path.join(
-                        temp_dir, "conversion_summary.txt")
-                    with open(summary_path, 'w') as f:
-                        f.write(summary_content)
-                    zipf.write(summary_path, "conversion_summary.txt")
-
-            logger.info(f"Created ZIP file with "
-                        f"{len(converted_files)} converted images")
-
-            # Return the ZIP file with background task to clean up temp directory
-
-            def cleanup_temp_dir():
-                try:
-                    shutil.rmtree(temp_dir)
-                    logger.info(f"Cleaned up temporary directory: {temp_dir}")
-                except Exception as e:
-                    logger.warning(f"Failed to clean up temporary directory "
-                                   f"{temp_dir}: {e}")
-
-            # Note: We can't use BackgroundTasks here since it's not in the function signature
-            # Instead, we'll rely on the OS to clean up /tmp eventually
-            return FileResponse(
-                path=zip_path,
-                filename=zip_filename,
-                media_type='application/zip',
-                headers={
-                    "Content-Disposition": f"attachment; filename={zip_filename}"}
-            )
-
-        except HTTPException:
-            # Clean up temp directory on error
-            try:
-                shutil.rmtree(temp_dir)
-            except Exception:
-                pass
+            # The response status depends on whether anything converts, so wait for the first image
+            first_entry = await next_converted()
+        except BaseException:
+            for conversion in conversions:
+                conversion.cancel()
             raise
-        except Exception as e:
-            # Clean up temp directory on error
+
+        # Check if we have any converted files
+        if first_entry is None:
+            if conversion_errors:
+                error_summary = "; ".join(
+                    conversion_errors[:3])  # Show first 3 errors
+                if len(conversion_errors) > 3:
+                    error_summary += f" and " \
+                        f"{len(conversion_errors) - 3} more errors"
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"No files could be converted. Errors: "
+                    f"{error_summary}"
+                )
+            else:
+                raise HTTPException(
+                    status_code=422, detail="No files could be converted")
+
+        async def stream_zip():
+            buffer = _ZipStreamBuffer()
             try:
-                shutil.rmtree(temp_dir)
-            except Exception:
-                pass
-            raise
+                # PNG data is already compressed, so entries are stored as is
+                with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zipf:
+                    entry = first_entry
+                    while entry is not None:
+                        # Checksumming and copying a large image is left to a worker thread
+                        await asyncio.to_thread(zipf.writestr, *entry)
+                        yield buffer.take()
+                        # The image has been handed to the stream, so its slot is free
+                        convert_next()
+                        entry = await next_converted()
+
+                    # Add a summary file if there were errors
+                    if conversion_errors:
+                        summary_content = "Conversion Summary\n" + "=" * 50 + "\n\n"
+                        summary_content += f"Successfully converted: " \
+                            f"{converted_count} files\n"
+                        summary_content += f"Failed conversions: " \
+                            f"{len(conversion_errors)} files\n\n"
+                        summary_content += "Errors:\n" + \
+                            "\n".join(conversion_errors)
+                        # Unlike the images, the text summary compresses well
+                        zipf.writestr("conversion_summary.txt", summary_content,
+                                      compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+
+                logger.info(f"Streamed ZIP file with "
+                            f"{converted_count} converted images")
+                yield buffer.take()
+            finally:
+                # Stop remaining conversions if the client went away
+                for conversion in conversions:
+                    conversion.cancel()
+
+        zip_filename = f"converted_images_{Path(directory).name}.zip"
+        return StreamingResponse(
+            stream_zip(),
+            media_type='application/zip',
+            headers={
+                "Content-Disposition": f"attachment; filename={zip_filename}"}
+        )
 
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -452,68 +603,108 @@ async def download_converted_images(directory: str = Query(default="/workspace/o
             status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@app.get("/api/list-files")
-async def list_files(folder: str = Query(default="/workspace/output/images")):
+def _check_folder(folder: str):
+    """Reject folders that do not exist or are not directories"""
+    if not os.path.exists(folder):
+        raise HTTPException(
+            status_code=404, detail=f"Folder not found: {folder}")
+
+    if not os.path.isdir(folder):
+        raise HTTPException(
+            status_code=400, detail=f"Path is not a directory: {folder}")
+
+
+def _file_info(entry: os.DirEntry) -> dict:
+    """Plain dict in the shape of FileInfo, encoded by orjson without model instances"""
+    return {
+        "filename": entry.name,
+        "full_path": entry.path,
+        "thumbnail": None,
+        "image_url": None,
+        "thumbnail_url": None,
+    }
+
+
+def _image_urls(file_path: str, version: str) -> dict:
+    """URLs of the thumbnail and the full-size image for an image file"""
+    quoted_path = quote(file_path)
+    return {
+        "thumbnail_url": f"/api/thumbnail?file_path={quoted_path}&v={version}",
+        "image_url": f"/api/serve-image?file_path={quoted_path}",
+    }
+
+
+@app.get("/api/list-files", response_model=ListFilesResponse)
+async def list_files(request: Request,
+                     folder: str = Query(default="/workspace/output/images"),
+                     inline_thumbs: bool = Query(default=False)):
     """
-    List all files in a specified server-side folder with thumbnails for images.
+    List all files in a specified server-side folder with thumbnail URLs for images.
+
+    Unchanged folders are answered with 304 Not Modified when the client sends the previous ETag.
 
     Args:
         folder: Server-side folder path to list files from (default: /workspace/output/images)
+        inline_thumbs: Embed base64 thumbnails instead of linking them via /api/thumbnail
 
     Returns:
         JSON array containing file information with thumbnails for images
     """
     try:
-        # Validate folder exists
-        if not os.path.exists(folder):
-            raise HTTPException(
-                status_code=404, detail=f"Folder not found: {folder}")
-
-        if not os.path.isdir(folder):
-            raise HTTPException(
-                status_code=400, detail=f"Path is not a directory: {folder}")
+        _check_folder(folder)
 
         logger.info(f"Listing files in folder: {folder}")
 
         file_list = []
+        versions = {}
 
         try:
-            # Get all files in the directory
-            for filename in os.listdir(folder):
-                file_path = os.path.join(folder, filename)
-
-                # Skip directories, only include files
-                if os.path.isfile(file_path):
-                    # Create base file info
-                    file_info = FileInfo(
-                        filename=filename,
-                        full_path=file_path,
-                        thumbnail=None,
-                        image_url=None
-                    )
-
-                    # Generate thumbnail and image URL if it's an image file
-                    if is_image_file(file_path):
+            # scandir reports the entry type without a second stat per file
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    # Skip directories, only include files
+                    if entry.is_file():
                         try:
-                            thumbnail_base64 = get_thumbnail_base64(file_path)
-                            if thumbnail_base64:
-                                file_info.thumbnail = f"data:image/jpeg;base64,{thumbnail_base64}"
-
-                            # Create URL for full-size image
-                            from urllib.parse import quote
-                            file_info.image_url = f"/api/serve-image?file_path={quote(file_path)}"
-                        except Exception as e:
-                            logger.warning(f"Failed to generate thumbnail for {file_path}: {e}")
-                            # Continue without thumbnail
-
-                    file_list.append(file_info)
+                            versions[entry.path] = _image_version(entry.stat())
+                        except FileNotFoundError:
+                            # Removed while listing
+                            continue
+                        file_list.append(_file_info(entry))
+
+            # The listing only changes when a file is added, removed or rewritten
+            listing_key = f"{inline_thumbs}\n" + "\n".join(sorted(
+                f"{file_info['filename']}:{versions[file_info['full_path']]}" for file_info in file_list))
+            etag = f'W/"{hashlib.md5(listing_key.encode()).hexdigest()}"'
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if _etag_matches(request, etag):
+                return Response(status_code=304, headers=headers)
+
+            images = [file_info for file_info in file_list if is_image_file(file_info["full_path"])]
+            if inline_thumbs:
+                # Generate thumbnails for all images concurrently in worker threads
+                thumbnails = await asyncio.gather(
+                    *(asyncio.to_thread(get_thumbnail_base64, file_info["full_path"]) for file_info in images),
+                    return_exceptions=True)
+
+                for file_info, thumbnail_base64 in zip(images, thumbnails):
+                    if isinstance(thumbnail_base64, Exception):
+                        logger.warning(f"Failed to generate thumbnail for {file_info['full_path']}: {thumbnail_base64}")
+                    elif thumbnail_base64:
+                        file_info["thumbnail"] = f"data:image/jpeg;base64,{thumbnail_base64}"
+
+            for file_info in images:
+                urls = _image_urls(file_info["full_path"], versions[file_info["full_path"]])
+                if inline_thumbs:
+                    del urls["thumbnail_url"]
+                # Otherwise let the browser fetch and cache each thumbnail separately
+                file_info.update(urls)
 
             # Sort files by name for consistent ordering
-            file_list.sort(key=lambda x: x.filename.lower())
+            file_list.sort(key=lambda x: x["filename"].lower())
 
             logger.info(f"Found {len(file_list)} files in {folder}")
 
-            return ListFilesResponse(files=file_list)
+            return ORJSONResponse({"files": file_list}, headers=headers)
 
         except PermissionError:
             raise HTTPException(
@@ -532,11 +723,87 @@ async def list_files(folder: str = Query(default="/workspace/output/images")):
             status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@app.get("/api/list-files/stream")
+async def stream_files(folder: str = Query(default="/workspace/output/images")):
+    """
+    Stream the files in a server-side folder as newline-delimited JSON.
+
+    Each line is one FileInfo object with thumbnail and image URLs for images, written
+    as soon as the directory entry has been read. Files are not sorted, so large folders
+    start arriving before the whole directory has been listed.
+
+    Args:
+        folder: Server-side folder path to list files from (default: /workspace/output/images)
+
+    Returns:
+        application/x-ndjson stream with one file per line
+    """
+    _check_folder(folder)
+
+    logger.info(f"Streaming files in folder: {folder}")
+
+    try:
+        # Opened here so that unreadable folders still fail with a status code
+        entries = os.scandir(folder)
+    except PermissionError:
+        raise HTTPException(
+            status_code=403, detail=f"Permission denied accessing folder: {folder}")
+
+    def generate_lines():
+        # Run by Starlette in a worker thread, one directory entry at a time
+        with entries:
+            for entry in entries:
+                try:
+                    if not entry.is_file():
+                        continue
+                    version = _image_version(entry.stat())
+                except FileNotFoundError:
+                    # Removed while listing
+                    continue
+                file_info = _file_info(entry)
+                if is_image_file(entry.path):
+                    file_info.update(_image_urls(entry.path, version))
+                yield orjson.dumps(file_info) + b"\n"
+
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
+
+def _check_image_path(file_path: str):
+    """Reject paths that are not image files inside the allowed directories"""
+    # Validate that the file exists and is actually a file
+    if not os.path.exists(file_path):
+        raise HTTPException(
+            status_code=404, detail=f"File not found: {file_path}")
+
+    if not os.path.isfile(file_path):
+        raise HTTPException(
+            status_code=400, detail=f"Path is not a file: {file_path}")
+
+    # Security check: ensure the file is an image
+    if not is_image_file(file_path):
+        raise HTTPException(
+            status_code=400, detail=f"File is not an image: {file_path}")
+
+    # Additional security: prevent path traversal attacks by ensuring the file is within allowed directories.
+    # Comparing whole path components keeps e.g. /workspace_evil out, and resolving symlinks keeps links out
+    real_path = os.path.realpath(file_path)
+    if not any(os.path.commonpath([real_path, root]) == root for root in ALLOWED_IMAGE_ROOTS):
+        raise HTTPException(
+            status_code=403, detail="Access to this file path is not allowed")
+
+
+def _image_version(file_stat: os.stat_result) -> str:
+    """Version of an image file that changes whenever the file is rewritten"""
+    return f"{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}"
+
+
 @app.get("/api/serve-image")
-async def serve_image(file_path: str = Query(..., description="Full path to the image file")):
+async def serve_image(request: Request, file_path: str = Query(..., description="Full path to the image file")):
     """
     Serve a full-size image file from the server filesystem.
 
+    Repeat requests with the current ETag are answered with 304 Not Modified.
+
     Args:
         file_path: Full path to the image file on the server
 
@@ -544,50 +811,30 @@ async def serve_image(file_path: str = Query(..., description="Full path to the
         The image file as a response
     """
     try:
-        # Validate that the file exists and is actually a file
-        if not os.path.exists(file_path):
-            raise HTTPException(
-                status_code=404, detail=f"File not found: {file_path}")
-
-        if not os.path.isfile(file_path):
-            raise HTTPException(
-                status_code=400, detail=f"Path is not a file: {file_path}")
-
-        # Security check: ensure the file is an image
-        if not is_image_file(file_path):
-            raise HTTPException(
-                status_code=400, detail=f"File is not an image: {file_path}")
-
-        # Additional security: prevent path traversal attacks by ensuring the file is within allowed directories
-        # Add other allowed directories as needed
-        allowed_dirs = ["/workspace", "/tmp"]
-        if not any(os.path.abspath(file_path).startswith(os.path.abspath(allowed_dir)) for allowed_dir in allowed_dirs):
-            raise HTTPException(
-                status_code=403, detail="Access to this file path is not allowed")
+        _check_image_path(file_path)
 
         # Determine the media type based on file extension
         file_extension = os.path.splitext(file_path)[1].lower()
-        media_type_map = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp',
-            '.bmp': 'image/bmp',
-            '.tiff': 'image/tiff',
-            '.tif': 'image/tiff'
-        }
-
-        media_type = media_type_map.get(
+        media_type = IMAGE_MEDIA_TYPES.get(
             file_extension, 'application/octet-stream')
 
-        logger.info(f"Serving image: {file_path} as {media_type}")
-
-        return FileResponse(
+        # Browsers revalidate on every use, so rewritten images show up immediately
+        response = FileResponse(
             path=file_path,
             media_type=media_type,
-            filename=os.path.basename(file_path)
+            filename=os.path.basename(file_path),
+            stat_result=os.stat(file_path),
+            headers={"Cache-Control": "no-cache"}
         )
+        if _etag_matches(request, response.headers["etag"]):
+            return Response(status_code=304, headers={
+                "ETag": response.headers["etag"],
+                "Cache-Control": "no-cache",
+            })
+
+        logger.info(f"Serving image: {file_path} as {media_type}")
+
+        return response
 
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -598,10 +845,47 @@ async def serve_image(file_path: str = Query(..., description="Full path to the
             status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@app.get("/api/thumbnail")
+async def serve_thumbnail(request: Request,
+                          file_path: str = Query(..., description="Full path to the image file"),
+                          v: Optional[str] = Query(default=None, description="Image version from /api/list-files")):
+    """
+    Serve a JPEG thumbnail of an image file from the server filesystem.
+
+    Args:
+        file_path: Full path to the image file on the server
+        v: Image version; responses for the current version may be cached indefinitely
+
+    Returns:
+        The thumbnail as a JPEG response
+    """
+    _check_image_path(file_path)
+
+    try:
+        version = _image_version(os.stat(file_path))
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"File not found: {file_path}")
+    headers = {
+        "ETag": f'"{version}"',
+        # Unversioned or outdated URLs must be revalidated on every use
+        "Cache-Control": THUMBNAIL_CACHE_CONTROL if v == version else "no-cache",
+    }
+    if _etag_matches(request, version):
+        return Response(status_code=304, headers=headers)
+
+    thumbnail_bytes = await asyncio.to_thread(get_thumbnail_bytes, file_path)
+    if not thumbnail_bytes:
+        raise HTTPException(
+            status_code=404, detail=f"Thumbnail not available: {file_path}")
+
+    return Response(thumbnail_bytes, media_type="image/jpeg", headers=headers)
+
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "mount_dir": os.getenv("MOUNT_DIR", "/workspace")}
+    return {"status": "healthy", "mount_dir": MOUNT_DIR}
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional, Dict, Any
 from enum import Enum
 
@@ -26,6 +26,8 @@ class ModelType(str, Enum):
 
 
 class CivitaiModelFile(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: int
     name: str
     type: str
@@ -36,6 +38,8 @@ class CivitaiModelFile(BaseModel):
 
 
 class CivitaiModelVersion(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: int
     name: str
     description: Optional[str] = None
@@ -46,6 +50,8 @@ class CivitaiModelVersion(BaseModel):
 
 
 class CivitaiModel(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: int
     name: str
     description: Optional[str] = None
@@ -62,14 +68,12 @@ class SearchRequest(BaseModel):
     period: Optional[str] = "AllTime"
     nsfw: Optional[bool] = None
     limit: int = 20
-    page: int = 1  # Only used for non-query searches
-    # Used for query searches (cursor-based pagination)
+    # Opaque Civitai cursor of the page to fetch (from metadata.nextCursor); None for the first page
     cursor: Optional[str] = None
     api_token: Optional[str] = None
 
-    class Config:
-        # Allow extra fields and ignore them
-        extra = "ignore"
+    # Allow extra fields and ignore them
+    model_config = ConfigDict(extra="ignore")
 
 
 class DownloadRequest(BaseModel):
@@ -114,6 +118,8 @@ class FileExistenceRequest(BaseModel):
 
 
 class FileExistenceStatus(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     civitai_model_id: int
     version_id: int
     file_id: int
@@ -123,17 +129,24 @@ class FileExistenceStatus(BaseModel):
 
 
 class FileExistenceResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     files: List[FileExistenceStatus]
 
 
 class FileInfo(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     filename: str
     full_path: str
     thumbnail: Optional[str] = None  # Base64-encoded thumbnail for images
     image_url: Optional[str] = None  # URL to serve full-size image
+    thumbnail_url: Optional[str] = None  # URL to fetch the thumbnail when it is not embedded
 
 
 class ListFilesResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     files: List[FileInfo]
 
 
@@ -161,3 +174,4 @@ class ConversionInfo(BaseModel):
     download_url: Optional[str] = None
     start_time: Optional[str] = None
     end_time: Optional[str] = None
+    start_ts: float = 0.0  # Unix timestamp of start_time for cheap age comparisons
@@ -21,9 +21,60 @@ Example of what it fixes:
     FIXED:
         file_info.thumbnail = f"data:image/jpeg;base64,{thumbnail_base64}"
 """
-import re
 import os
-import glob
+from concurrent.futures import ThreadPoolExecutor
+
+# Directories that never contain project sources
+SKIPPED_DIRECTORIES = {'__pycache__', 'node_modules', 'venv'}
+
+
+def broken_fstring_start(line):
+    """Return the index of the f-string left open at the end of the line after a '{', or -1."""
+    quote = line.rfind('"')
+    if quote < 1 or line[quote - 1] != 'f':
+        return -1
+    if not line[quote + 1:].rstrip().endswith('{'):
+        return -1
+    return quote - 1
+
+
+def fix_broken_fstrings(content):
+    """Join f-strings broken across lines after a '{' in a single pass over the lines."""
+    lines = content.splitlines(keepends=True)
+    fixed = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+        start = broken_fstring_start(line)
+        while start != -1:
+            # Collect the string's continuation lines up to its closing quote,
+            # which may follow after blank lines or further breaks
+            parts = [line[start + 2:].strip()]
+            j = i
+            while j < len(lines):
+                continuation = lines[j].strip()
+                j += 1
+                if not continuation:
+                    continue
+                closing_quote = continuation.find('"')
+                if closing_quote != -1:
+                    parts.append(continuation[:closing_quote].strip())
+                    rest = lines[j - 1].lstrip()[closing_quote + 1:]
+                    break
+                parts.append(continuation)
+            else:
+                j = len(lines) + 1
+            # The placeholder opened at the break has to be closed on the following lines
+            if j > len(lines) or '}' not in ''.join(parts[1:]):
+                # Not a broken f-string; leave the lines as they are
+                break
+            line = f'{line[:start]}f"{"".join(parts)}"{rest}'
+            i = j
+            # The rest of the last line may open another broken f-string
+            start = broken_fstring_start(line)
+        fixed.append(line)
+    return ''.join(fixed)
 
 
 def fix_broken_fstring_in_file(filepath):
@@ -37,27 +88,9 @@ def fix_broken_fstring_in_file(filepath):
 
     original_content = content
 
-    # Pattern to match broken f-strings like: f"text{# followed by whitespace and newlines, then the continuation
-    pattern = r'f"([^"]*{\s*)\n\s*([^}]*}[^"]*)"'
-
-    def fix_match(match):
-        prefix = match.group(1).strip()
-        suffix = match.group(2).strip()
-        return f'f"{prefix}{suffix}"'
-
-    # Fix the pattern
-    content = re.sub(pattern, fix_match, content, flags=re.MULTILINE)
-
-    # Also handle cases where the variable name is on the next line
-    pattern2 = r'f"([^"]*{)\s*\n\s*([^}]+)}([^"]*)"'
-
-    def fix_match2(match):
-        prefix = match.group(1).strip()
-        variable = match.group(2).strip()
-        suffix = match.group(3).strip()
-        return f'f"{prefix}{variable}{suffix}"'
-
-    content = re.sub(pattern2, fix_match2, content, flags=re.MULTILINE)
+    # Most files contain no f-strings at all
+    if 'f"' in content:
+        content = fix_broken_fstrings(content)
 
     if content != original_content:
         try:
@@ -71,24 +104,29 @@ def fix_broken_fstring_in_file(filepath):
     return False
 
 
+def find_python_files(root):
+    """Walk the tree once for .py files, skipping hidden directories, caches and dependencies."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Pruning in place keeps os.walk out of the skipped subtrees
+        dirnames[:] = [name for name in dirnames
+                       if not name.startswith('.') and name not in SKIPPED_DIRECTORIES]
+        for filename in filenames:
+            if filename.endswith('.py'):
+                yield os.path.relpath(os.path.join(dirpath, filename), root)
+
+
 def main():
     """Fix all Python files in the project."""
     print("🔧 Fixing broken f-strings caused by autopep8...")
 
     # Find all Python files
-    python_files = []
-    for pattern in ["*.py", "**/*.py"]:
-        python_files.extend(glob.glob(pattern, recursive=True))
-
-    # Remove duplicates and sort
-    python_files = sorted(set(python_files))
+    python_files = sorted(find_python_files("."))
 
     print(f"Found {len(python_files)} Python files to check")
 
-    fixed_count = 0
-    for filepath in python_files:
-        if fix_broken_fstring_in_file(filepath):
-            fixed_count += 1
+    # Files are independent and mostly waiting on disk, so check them in parallel
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        fixed_count = sum(executor.map(fix_broken_fstring_in_file, python_files))
 
     print(f"✅ Fixed broken f-strings in {fixed_count} files")
 
@@ -21,7 +21,7 @@ import {
 } from "./js/download.js";
 import "./js/gallery.js"; // Import to initialize GalleryManager
 import { showModelDetails } from "./js/models.js";
-import { changeCursor, changePage, performSearch } from "./js/search.js";
+import { changeCursor, performSearch } from "./js/search.js";
 import { appState, saveApiToken as stateSaveApiToken } from "./js/state.js";
 import { modalManager, openImageModal, showToast, tokenUI } from "./js/ui.js";
 
@@ -434,7 +434,6 @@ document.addEventListener("DOMContentLoaded", async () => {
 
   // Search functions
   window.changeCursor = changeCursor;
-  window.changePage = changePage;
 
   console.log("Civitai Model Loader initialized successfully");
 });
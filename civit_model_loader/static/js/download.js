@@ -18,6 +18,7 @@ import { escapeForOnclick, escapeHtml, formatFileSize } from "./utils.js";
 class DownloadManager {
   constructor() {
     this.pollInterval = null;
+    this.downloadSocket = null;
     this.progressBars = new Map();
     this.setupEventListeners();
   }
@@ -473,18 +474,46 @@ class DownloadManager {
   }
 
   /**
-   * Starts polling for download updates
+   * Starts receiving download updates, pushed over a WebSocket where possible
    */
   startDownloadPolling() {
+    if (!("WebSocket" in window)) {
+      this.startIntervalPolling();
+      return;
+    }
+
+    const protocol = window.location.protocol === "https:" ? "wss:" : "ws:";
+    const socket = new WebSocket(`${protocol}//${window.location.host}/ws/downloads`);
+    socket.onmessage = (event) => this.displayDownloadQueue(JSON.parse(event.data));
+    socket.onclose = () => {
+      // Fall back to polling if the server does not push (anymore)
+      if (this.downloadSocket === socket) {
+        this.downloadSocket = null;
+        this.startIntervalPolling();
+      }
+    };
+    this.downloadSocket = socket;
+  }
+
+  /**
+   * Starts polling for download updates
+   */
+  startIntervalPolling() {
+    if (this.pollInterval) return;
     // Poll download queue every 2 seconds
     this.pollInterval = setInterval(() => this.loadDownloadQueue(), 2000);
     appState.setPollInterval(this.pollInterval);
   }
 
   /**
-   * Stops polling for download updates
+   * Stops receiving download updates
    */
   stopDownloadPolling() {
+    if (this.downloadSocket) {
+      const socket = this.downloadSocket;
+      this.downloadSocket = null;
+      socket.close();
+    }
     if (this.pollInterval) {
       clearInterval(this.pollInterval);
       this.pollInterval = null;
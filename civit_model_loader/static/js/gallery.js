@@ -6,6 +6,15 @@
 import { listFiles } from "./api.js";
 import { showToast } from "./ui.js";
 
+/**
+ * Get the thumbnail source of a file, either an embedded data URL or a thumbnail URL
+ * @param {Object} file - File object from the file listing
+ * @returns {string|null} - Thumbnail source or null for files without preview
+ */
+function thumbnailSrc(file) {
+  return file.thumbnail || file.thumbnail_url || null;
+}
+
 /**
  * Manages the thumbnail gallery functionality
  */
@@ -140,7 +149,7 @@ class GalleryManager {
       this.files = response.files || [];
 
       // Filter to only image files (those with thumbnails)
-      const imageFiles = this.files.filter((file) => file.thumbnail);
+      const imageFiles = this.files.filter((file) => thumbnailSrc(file));
 
       if (imageFiles.length === 0) {
         this.setStatus("empty", `No images found in ${this.currentDirectory}`);
@@ -193,9 +202,9 @@ class GalleryManager {
     const imageContainer = document.createElement("div");
     imageContainer.className = "thumbnail-image";
 
-    if (file.thumbnail) {
+    if (thumbnailSrc(file)) {
       const img = document.createElement("img");
-      img.src = file.thumbnail;
+      img.src = thumbnailSrc(file);
       img.alt = file.filename;
       img.loading = "lazy";
 
@@ -261,7 +270,7 @@ class GalleryManager {
    * @param {number} index - Index of the image to display
    */
   openLightbox(index) {
-    const imageFiles = this.files.filter((file) => file.thumbnail);
+    const imageFiles = this.files.filter((file) => thumbnailSrc(file));
 
     if (index < 0 || index >= imageFiles.length || !this.lightboxModal) return;
 
@@ -270,7 +279,7 @@ class GalleryManager {
 
     // Set image source (use full-size image URL if available, fallback to thumbnail)
     if (this.lightboxImage) {
-      this.lightboxImage.src = file.image_url || file.thumbnail;
+      this.lightboxImage.src = file.image_url || thumbnailSrc(file);
       this.lightboxImage.alt = file.filename;
     }
 
@@ -306,7 +315,7 @@ class GalleryManager {
    * @param {number} direction - Direction to navigate (-1 for previous, 1 for next)
    */
   navigateImage(direction) {
-    const imageFiles = this.files.filter((file) => file.thumbnail);
+    const imageFiles = this.files.filter((file) => thumbnailSrc(file));
     const newIndex = this.currentImageIndex + direction;
 
     if (newIndex >= 0 && newIndex < imageFiles.length) {
@@ -5,6 +5,7 @@
 import { getModelDetails, searchModels } from "./api.js";
 import {
   appState,
+  getCurrentPage,
   getCurrentSearch,
   getNsfwPreference,
   setCurrentPage,
@@ -19,6 +20,7 @@ import { escapeHtml, truncateDescription } from "./utils.js";
 class SearchManager {
   constructor() {
     this.currentSearchMode = "query"; // Default search mode
+    this.cursorHistory = []; // Cursors of the pages before the current one
     this.setupEventListeners();
   }
 
@@ -120,6 +122,7 @@ class SearchManager {
   async performQuerySearch() {
     // Reset to first page for new searches
     setCurrentPage(1);
+    this.cursorHistory = [];
 
     const query = document.getElementById("searchQuery")?.value.trim() || "";
     const modelType = document.getElementById("modelType")?.value || "";
@@ -131,7 +134,6 @@ class SearchManager {
       sort: sortBy,
       nsfw: getNsfwPreference() ? true : null, // Only send true or null, not false
       limit: 20,
-      page: 1, // Always start from page 1 for new searches
       cursor: null, // Always start from beginning for new searches
       searchMode: "query", // Add search mode for tracking
     };
@@ -317,39 +319,18 @@ class SearchManager {
   }
 
   /**
-   * Sets up pagination controls
+   * Sets up cursor-based pagination controls
    * @param {Object} metadata - Search metadata from API
    */
   setupPagination(metadata) {
     const container = document.getElementById("pagination");
     if (!container) return;
 
-    // Check if this is a query search (cursor-based pagination)
-    const currentSearch = getCurrentSearch();
-    const isQuerySearch = currentSearch && currentSearch.query;
-
-    if (isQuerySearch) {
-      // For query searches, use cursor-based pagination
-      this.setupCursorPagination(metadata, container);
-      return;
-    }
-
-    // Regular page-based pagination
-    this.setupPagePagination(metadata, container);
-  }
-
-  /**
-   * Sets up cursor-based pagination for query searches
-   * @param {Object} metadata - Search metadata
-   * @param {Element} container - Pagination container
-   */
-  setupCursorPagination(metadata, container) {
     let paginationHtml = "";
     const currentSearch = getCurrentSearch();
 
-    // Previous button (if we have a previous cursor or this isn't the first page)
-    const hasPrevious =
-      currentSearch.cursor || (metadata && metadata.prevCursor);
+    // Previous button (if there is a page before this one)
+    const hasPrevious = this.cursorHistory.length > 0;
     paginationHtml += `<button onclick="window.changeCursor('prev')" ${
       !hasPrevious ? "disabled" : ""
     }>Previous</button>`;
@@ -360,12 +341,12 @@ class SearchManager {
       currentSearch.types && currentSearch.types.length > 0
         ? ` (${currentSearch.types.join(", ")})`
         : "";
-    paginationHtml += `<span style="margin: 0 15px; color: #666;">Search results${
-      queryInfo ? ` for "${queryInfo}"` : ""
+    paginationHtml += `<span style="margin: 0 15px; color: #666;">Page ${getCurrentPage()}${
+      queryInfo ? ` of results for "${escapeHtml(queryInfo)}"` : ""
     }${typeInfo}</span>`;
 
     // Next button (if metadata indicates more results)
-    const hasNext = metadata && (metadata.nextCursor || metadata.nextPage);
+    const hasNext = metadata && metadata.nextCursor;
     paginationHtml += `<button onclick="window.changeCursor('next')" ${
       !hasNext ? "disabled" : ""
     }>Next</button>`;
@@ -373,45 +354,6 @@ class SearchManager {
     container.innerHTML = paginationHtml;
   }
 
-  /**
-   * Sets up page-based pagination for non-query searches
-   * @param {Object} metadata - Search metadata
-   * @param {Element} container - Pagination container
-   */
-  setupPagePagination(metadata, container) {
-    const totalPages = metadata.totalPages || 1;
-    const currentPageNum = metadata.currentPage || 1;
-
-    if (totalPages <= 1) {
-      container.innerHTML = "";
-      return;
-    }
-
-    let paginationHtml = "";
-
-    // Previous button
-    paginationHtml += `<button onclick="window.changePage(${
-      currentPageNum - 1
-    })" ${currentPageNum <= 1 ? "disabled" : ""}>Previous</button>`;
-
-    // Page numbers (show current, 2 before, 2 after)
-    const startPage = Math.max(1, currentPageNum - 2);
-    const endPage = Math.min(totalPages, currentPageNum + 2);
-
-    for (let i = startPage; i <= endPage; i++) {
-      paginationHtml += `<button onclick="window.changePage(${i})" ${
-        i === currentPageNum ? 'class="active"' : ""
-      }>${i}</button>`;
-    }
-
-    // Next button
-    paginationHtml += `<button onclick="window.changePage(${
-      currentPageNum + 1
-    })" ${currentPageNum >= totalPages ? "disabled" : ""}>Next</button>`;
-
-    container.innerHTML = paginationHtml;
-  }
-
   /**
    * Changes cursor for cursor-based pagination
    * @param {string} direction - 'next' or 'prev'
@@ -423,19 +365,23 @@ class SearchManager {
       return;
     }
 
-    // For cursor-based pagination, we need to get the nextCursor from the last response
+    // The next cursor comes from the last response; previous cursors are kept in a history stack
     if (direction === "next") {
       const lastMetadata = appState.getLastSearchMetadata();
       if (lastMetadata && lastMetadata.nextCursor) {
+        this.cursorHistory.push(currentSearch.cursor || null);
         currentSearch.cursor = lastMetadata.nextCursor;
+        setCurrentPage(getCurrentPage() + 1);
       } else {
         showToast("No more results available", "warning");
         return;
       }
     } else if (direction === "prev") {
-      // For previous, remove the cursor to go back to the beginning
-      // In a full implementation, we'd maintain a cursor history stack
-      currentSearch.cursor = null;
+      if (this.cursorHistory.length === 0) {
+        return;
+      }
+      currentSearch.cursor = this.cursorHistory.pop();
+      setCurrentPage(getCurrentPage() - 1);
     }
 
     // Clean the search request before storing and using it
@@ -444,36 +390,6 @@ class SearchManager {
     await this.performSearchWithRequest(cleanedSearch);
   }
 
-  /**
-   * Changes page for page-based pagination
-   * @param {number} page - Page number to navigate to
-   */
-  async changePage(page) {
-    const currentSearch = getCurrentSearch();
-    if (!currentSearch || currentSearch.searchMode === "id") {
-      // No pagination for model ID search
-      return;
-    }
-
-    // Ensure page is a valid number
-    const pageNum = parseInt(page);
-    if (isNaN(pageNum) || pageNum < 1) {
-      console.error("Invalid page number:", page);
-      return;
-    }
-
-    setCurrentPage(pageNum);
-
-    if (currentSearch) {
-      // Update the page in the stored search request and perform search
-      currentSearch.page = pageNum;
-      // Clean the search request before storing and using it
-      const cleanedSearch = this.cleanSearchRequest(currentSearch);
-      setCurrentSearch(cleanedSearch);
-      await this.performSearchWithRequest(cleanedSearch);
-    }
-  }
-
   /**
    * Shows loading state in the results container
    * @param {Element} container - Results container element
@@ -635,6 +551,7 @@ class SearchManager {
     this.clearPagination();
     setCurrentSearch(null);
     setCurrentPage(1);
+    this.cursorHistory = [];
     appState.setLastSearchMetadata(null);
   }
 
@@ -690,14 +607,9 @@ export function changeCursor(direction) {
   return searchManager.changeCursor(direction);
 }
 
-export function changePage(page) {
-  return searchManager.changePage(page);
-}
-
 export function clearSearchResults() {
   return searchManager.clearResults();
 }
 
 // Make functions available globally for onclick handlers
 window.changeCursor = changeCursor;
-window.changePage = changePage;
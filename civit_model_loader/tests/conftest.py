@@ -4,6 +4,8 @@ Pytest configuration and shared fixtures for all test modules.
 
 import os
 import sys
+import json
+import importlib.util
 import tempfile
 import pytest
 from pathlib import Path
@@ -25,12 +27,33 @@ try:
 except ImportError:
     MODELS_AVAILABLE = False
 
+# Only checked, not imported: main mounts its static files relative to the working directory,
+# so the endpoint test modules import it themselves
+MAIN_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ("fastapi", "main"))
+
 try:
     from test_config import CIVITAI_API_KEY
 except ImportError:
     CIVITAI_API_KEY = "test_api_key_placeholder"
 
 
+@pytest.fixture(autouse=True)
+def isolated_thumbnail_cache(tmp_path):
+    """Give every test a fresh global thumbnail cache with its disk cache in a temporary directory."""
+    if not THUMBNAIL_AVAILABLE:
+        yield
+        return
+    # Swapped by hand rather than with monkeypatch, so that tests patching os functions
+    # through monkeypatch still undo them before their temporary directories are removed
+    import thumbnail
+    original = thumbnail._thumbnail_cache
+    thumbnail._thumbnail_cache = ThumbnailCache(disk_cache_dir=str(tmp_path / "thumb_cache"))
+    try:
+        yield
+    finally:
+        thumbnail._thumbnail_cache = original
+
+
 @pytest.fixture
 def temp_dir():
     """Create a temporary directory for test files."""
@@ -127,6 +150,29 @@ def create_test_text_file(path, content="Test file content"):
     return path
 
 
+def make_request(path, headers=None):
+    """Build a GET request for path with the given headers, for calling endpoint functions directly."""
+    from starlette.requests import Request
+    raw_headers = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": path, "headers": raw_headers})
+
+
+def make_json_request(path, payload, content_type="application/json"):
+    """Build a POST request for path with payload as its JSON body."""
+    from starlette.requests import Request
+    body = json.dumps(payload).encode()
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "headers": [(b"content-type", content_type.encode())],
+    }, receive)
+
+
 # Skip markers for conditional testing
 def skip_if_no_fastapi():
     """Skip test if FastAPI is not available."""
@@ -137,6 +183,11 @@ def skip_if_no_fastapi():
         return pytest.mark.skip(reason="FastAPI not available")
 
 
+def skip_if_no_main():
+    """Skip test if the main module with the FastAPI app is not available."""
+    return pytest.mark.skipif(not MAIN_AVAILABLE, reason="main module not available")
+
+
 def skip_if_no_thumbnail():
     """Skip test if thumbnail module is not available."""
     return pytest.mark.skipif(not THUMBNAIL_AVAILABLE, reason="Thumbnail module not available")
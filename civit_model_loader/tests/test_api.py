@@ -5,9 +5,21 @@ Tests various CivitAI API calls to identify correct parameter formats using pyte
 
 import pytest
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from conftest import civitai_api_key
 
+# One session for all tests so connections and TLS sessions to civitai.com are reused;
+# rate limiting and gateway errors are retried, other statuses reach the assertions
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.3,
+                      status_forcelist=[429, 502, 503, 504], raise_on_status=False)
+))
+
 
 class TestCivitAIAPIBasic:
     """Test basic CivitAI API functionality."""
@@ -27,7 +39,7 @@ class TestCivitAIAPIBasic:
     @pytest.mark.integration
     def test_basic_models_endpoint(self, api_config):
         """Test basic models endpoint without parameters."""
-        response = requests.get(
+        response = SESSION.get(
             f"{api_config['base_url']}/models",
             headers=api_config['headers'],
             params={'limit': 1},
@@ -42,7 +54,7 @@ class TestCivitAIAPIBasic:
     @pytest.mark.integration
     def test_api_without_key(self, api_config):
         """Test API access without authentication."""
-        response = requests.get(
+        response = SESSION.get(
             f"{api_config['base_url']}/models",
             params={'limit': 1},
             timeout=10
@@ -60,7 +72,7 @@ class TestCivitAIAPIBasic:
             'limit': 1,
             'query': 'landscape'
         }
-        response = requests.get(
+        response = SESSION.get(
             f"{api_config['base_url']}/models",
             headers=api_config['headers'],
             params=params,
@@ -99,7 +111,7 @@ class TestCivitAIAPISortParameters:
             'limit': 1,
             'sort': sort_param
         }
-        response = requests.get(
+        response = SESSION.get(
             f"{api_config['base_url']}/models",
             headers=api_config['headers'],
             params=params,
@@ -144,7 +156,7 @@ class TestCivitAIAPIPeriodParameters:
             'sort': 'Most Downloaded',
             'period': period_param
         }
-        response = requests.get(
+        response = SESSION.get(
             f"{api_config['base_url']}/models",
             headers=api_config['headers'],
             params=params,
@@ -185,7 +197,7 @@ class TestCivitAIAPIModelTypes:
             'limit': 1,
             'types': model_type
         }
-        response = requests.get(
+        response = SESSION.get(
             f"{api_config['base_url']}/models",
             headers=api_config['headers'],
             params=params,
@@ -217,7 +229,7 @@ class TestCivitAIAPIErrorHandling:
     @pytest.mark.integration
     def test_invalid_endpoint(self, api_config):
         """Test with invalid API endpoint."""
-        response = requests.get(
+        response = SESSION.get(
             f"{api_config['base_url']}/invalid_endpoint",
             headers=api_config['headers'],
             timeout=10
@@ -229,7 +241,7 @@ class TestCivitAIAPIErrorHandling:
     def test_large_limit_parameter(self, api_config):
         """Test with unreasonably large limit parameter."""
         params = {'limit': 10000}
-        response = requests.get(
+        response = SESSION.get(
             f"{api_config['base_url']}/models",
             headers=api_config['headers'],
             params=params,
@@ -246,7 +258,7 @@ class TestCivitAIAPIErrorHandling:
             'limit': 1,
             'invalid_param': 'invalid_value'
         }
-        response = requests.get(
+        response = SESSION.get(
             f"{api_config['base_url']}/models",
             headers=api_config['headers'],
             params=params,
@@ -269,7 +281,7 @@ class TestCivitAIAPIIntegration:
             'User-Agent': 'CivitAI-Model-Loader/1.0'
         }
 
-        response = requests.get(
+        response = SESSION.get(
             'https://civitai.com/api/v1/models',
             headers=headers,
             params={'limit': 2},
@@ -298,7 +310,7 @@ class TestCivitAIAPIIntegration:
             'User-Agent': 'CivitAI-Model-Loader/1.0'
         }
 
-        response = requests.get(
+        response = SESSION.get(
             'https://civitai.com/api/v1/models',
             headers=headers,
             params={'limit': 1, 'page': 1},
@@ -0,0 +1,122 @@
+"""
+Tests for the /api/check-files endpoint.
+Tests checking downloaded model files on disk using pytest.
+"""
+
+import os
+import shutil
+import pytest
+
+from conftest import MAIN_AVAILABLE, skip_if_no_main, make_json_request
+
+if MAIN_AVAILABLE:
+    import main
+    from main import check_file_existence
+    from download_manager import DownloadManager
+    from models import FileExistenceResponse
+
+
+async def check_files(payload):
+    """Call the endpoint and parse its JSON response."""
+    response = await check_file_existence(make_json_request("/api/check-files", payload))
+    return FileExistenceResponse.model_validate_json(response.body)
+
+
+def model_file(file_id, filename):
+    return {"civitai_model_id": 1, "version_id": 2, "file_id": file_id, "filename": filename}
+
+
+def write_model(models_dir, filename):
+    with open(os.path.join(models_dir, filename), 'wb') as f:
+        f.write(b"model")
+
+
+@skip_if_no_main()
+class TestCheckFiles:
+    """Test the file existence check."""
+
+    @pytest.fixture
+    def models_dir(self, temp_dir, monkeypatch):
+        manager = DownloadManager(temp_dir)
+        monkeypatch.setattr(main, "download_manager", manager)
+        return str(manager.models_dir)
+
+    async def test_reports_existing_and_missing_files(self, models_dir):
+        """Test that only files present in the models directory are reported as existing."""
+        os.makedirs(os.path.join(models_dir, "folder.safetensors"))
+        write_model(models_dir, "present.safetensors")
+
+        response = await check_files({"files": [
+            model_file(1, "present.safetensors"),
+            model_file(2, "missing.safetensors"),
+            model_file(3, "folder.safetensors"),
+        ]})
+
+        assert [status.exists for status in response.files] == [True, False, False]
+        assert response.files[0].file_path == os.path.join(models_dir, "present.safetensors")
+
+    async def test_files_in_subdirectories(self, models_dir):
+        """Test that names with a subdirectory are checked on disk."""
+        os.makedirs(os.path.join(models_dir, "lora"))
+        write_model(os.path.join(models_dir, "lora"), "present.safetensors")
+
+        response = await check_files({"files": [
+            model_file(1, os.path.join("lora", "present.safetensors")),
+            model_file(2, os.path.join("lora", "missing.safetensors")),
+            model_file(3, os.path.join("missing", "present.safetensors")),
+        ]})
+
+        assert [status.exists for status in response.files] == [True, False, False]
+
+    async def test_unreadable_subdirectory(self, models_dir, monkeypatch):
+        """Test that files in a subdirectory that cannot be listed are reported as missing."""
+        os.makedirs(os.path.join(models_dir, "locked"))
+        write_model(os.path.join(models_dir, "locked"), "present.safetensors")
+        scandir = os.scandir
+
+        def failing_scandir(path):
+            if os.path.basename(path) == "locked":
+                raise PermissionError(f"Permission denied: {path}")
+            return scandir(path)
+
+        monkeypatch.setattr(os, "scandir", failing_scandir)
+
+        response = await check_files({"files": [
+            model_file(1, os.path.join("locked", "present.safetensors")),
+        ]})
+
+        assert [status.exists for status in response.files] == [False]
+
+    async def test_absolute_filenames_stay_in_models_directory(self, models_dir, temp_dir):
+        """Test that absolute filenames are not looked up outside the models directory."""
+        write_model(temp_dir, "outside.safetensors")
+
+        response = await check_files({"files": [
+            model_file(1, os.path.join(temp_dir, "outside.safetensors")),
+        ]})
+
+        assert [status.exists for status in response.files] == [False]
+        assert response.files[0].file_path.startswith(models_dir + os.sep)
+
+    async def test_missing_models_directory(self, models_dir):
+        """Test that a missing models directory reports all files as missing."""
+        shutil.rmtree(models_dir)
+
+        response = await check_files({"files": [
+            model_file(1, "present.safetensors"),
+        ]})
+
+        assert [status.exists for status in response.files] == [False]
+
+    async def test_directory_listing_is_cached(self, models_dir):
+        """Test that files added within the cache TTL are not seen until the listing expires."""
+        request = {"files": [model_file(1, "late.safetensors")]}
+        await check_files(request)
+        write_model(models_dir, "late.safetensors")
+
+        cached = await check_files(request)
+        main.download_manager._model_files = (0.0, main.download_manager._model_files[1])
+        rescanned = await check_files(request)
+
+        assert [status.exists for status in cached.files] == [False]
+        assert [status.exists for status in rescanned.files] == [True]
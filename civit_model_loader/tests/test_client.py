@@ -3,16 +3,34 @@ Tests for the CivitaiClient implementation.
 Tests the client wrapper around CivitAI API using pytest.
 """
 
+import os
+import asyncio
+import hashlib
+import threading
 import pytest
 from conftest import civitai_api_key
 
+try:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
 # Try to import client and models
 try:
-    from civitai_client import CivitaiClient
+    import civitai_client
+    from civitai_client import CivitaiClient, get_client
     CLIENT_AVAILABLE = True
 except ImportError:
     CLIENT_AVAILABLE = False
 
+try:
+    from civitai_client import TTLCache
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
+
 try:
     from models import SearchRequest, ModelType
     MODELS_AVAILABLE = True
@@ -29,6 +47,90 @@ skip_if_no_models = pytest.mark.skipif(
     reason="Models module not available"
 )
 
+skip_if_no_aiohttp = pytest.mark.skipif(
+    not AIOHTTP_AVAILABLE,
+    reason="aiohttp not available"
+)
+
+
+@pytest.fixture
+def download_payload():
+    """Deterministic payload spanning several download chunks."""
+    return bytes(range(256)) * (3 * 4096 + 17)
+
+
+@pytest.fixture
+async def file_server(temp_dir, download_payload):
+    """Local HTTP server serving the payload at /model.safetensors."""
+    source_path = os.path.join(temp_dir, "source.bin")
+    with open(source_path, 'wb') as f:
+        f.write(download_payload)
+
+    received = []
+
+    async def handler(request):
+        received.append(request)
+        return web.FileResponse(source_path)
+
+    async def no_ranges_handler(request):
+        received.append(request)
+        return web.Response(body=download_payload)
+
+    async def failing_ranges_handler(request):
+        received.append(request)
+        if "Range" in request.headers:
+            return web.Response(status=503)
+        return web.Response(body=download_payload, headers={"Accept-Ranges": "bytes"})
+
+    app = web.Application()
+    app.router.add_get("/model.safetensors", handler)
+    app.router.add_get("/no-ranges.safetensors", no_ranges_handler)
+    app.router.add_get("/failing-ranges.safetensors", failing_ranges_handler)
+    server = TestServer(app)
+    await server.start_server()
+    server.received = received
+    try:
+        yield server
+    finally:
+        await server.close()
+        await CivitaiClient.close_session()
+
+
+@pytest.fixture
+async def api_server(monkeypatch):
+    """Local stand-in for the Civitai API that records incoming requests."""
+    received = []
+
+    async def models_handler(request):
+        received.append(request)
+        return web.json_response({"items": [], "metadata": {}})
+
+    async def model_version_handler(request):
+        received.append(request)
+        version_id = int(request.match_info["version_id"])
+        return web.json_response({
+            "id": version_id,
+            "files": [
+                {"id": 1, "name": "first.safetensors", "downloadUrl": "https://example.com/1"},
+                {"id": 2, "name": "second.safetensors", "downloadUrl": "https://example.com/2"},
+            ]
+        })
+
+    app = web.Application()
+    app.router.add_get("/models", models_handler)
+    app.router.add_get("/model-versions/{version_id}", model_version_handler)
+    server = TestServer(app)
+    await server.start_server()
+    monkeypatch.setattr(CivitaiClient, "BASE_URL", str(server.make_url("")).rstrip("/"))
+    CivitaiClient.clear_cache()
+    server.received = received
+    try:
+        yield server
+    finally:
+        CivitaiClient.clear_cache()
+        await server.close()
+        await CivitaiClient.close_session()
+
 
 @skip_if_no_client
 class TestCivitaiClientBasic:
@@ -46,16 +148,15 @@ class TestCivitaiClientBasic:
 
     @skip_if_no_models
     @pytest.mark.integration
-    def test_basic_search_without_api_key(self):
+    async def test_basic_search_without_api_key(self):
         """Test basic search functionality without API key."""
         client = CivitaiClient()
         search_request = SearchRequest(
             query="test",
-            limit=1,
-            page=1
+            limit=1
         )
 
-        results = client.search_models(search_request)
+        results = await client.search_models(search_request)
 
         assert isinstance(results, dict)
         assert 'items' in results
@@ -63,16 +164,15 @@ class TestCivitaiClientBasic:
 
     @skip_if_no_models
     @pytest.mark.integration
-    def test_basic_search_with_api_key(self, civitai_api_key):
+    async def test_basic_search_with_api_key(self, civitai_api_key):
         """Test basic search functionality with API key."""
         client = CivitaiClient(api_token=civitai_api_key)
         search_request = SearchRequest(
             query="test",
-            limit=1,
-            page=1
+            limit=1
         )
 
-        results = client.search_models(search_request)
+        results = await client.search_models(search_request)
 
         assert isinstance(results, dict)
         assert 'items' in results
@@ -89,7 +189,7 @@ class TestSearchRequest:
         request = SearchRequest(limit=1)
 
         assert request.limit == 1
-        assert request.page is None or request.page == 1
+        assert request.cursor is None
         assert request.query is None
 
     def test_search_request_full_parameters(self):
@@ -97,7 +197,7 @@ class TestSearchRequest:
         request = SearchRequest(
             query="landscape",
             limit=10,
-            page=2,
+            cursor="abc",
             sort="Most Downloaded",
             period="AllTime",
             types=[ModelType.CHECKPOINT]
@@ -105,13 +205,13 @@ class TestSearchRequest:
 
         assert request.query == "landscape"
         assert request.limit == 10
-        assert request.page == 2
+        assert request.cursor == "abc"
         assert request.sort == "Most Downloaded"
         assert request.period == "AllTime"
         assert ModelType.CHECKPOINT in request.types
 
     @pytest.mark.integration
-    def test_search_with_model_types(self, civitai_api_key):
+    async def test_search_with_model_types(self, civitai_api_key):
         """Test search with specific model types."""
         client = CivitaiClient(api_token=civitai_api_key)
         search_request = SearchRequest(
@@ -119,13 +219,13 @@ class TestSearchRequest:
             limit=1
         )
 
-        results = client.search_models(search_request)
+        results = await client.search_models(search_request)
 
         assert isinstance(results, dict)
         assert 'items' in results
 
     @pytest.mark.integration
-    def test_search_with_sort_and_period(self, civitai_api_key):
+    async def test_search_with_sort_and_period(self, civitai_api_key):
         """Test search with sort and period parameters."""
         client = CivitaiClient(api_token=civitai_api_key)
         search_request = SearchRequest(
@@ -134,7 +234,7 @@ class TestSearchRequest:
             period="AllTime"
         )
 
-        results = client.search_models(search_request)
+        results = await client.search_models(search_request)
 
         assert isinstance(results, dict)
         assert 'items' in results
@@ -145,31 +245,31 @@ class TestSearchRequest:
 class TestClientErrorHandling:
     """Test client error handling."""
 
-    def test_empty_search_request(self, civitai_api_key):
+    async def test_empty_search_request(self, civitai_api_key):
         """Test with minimal search request."""
         client = CivitaiClient(api_token=civitai_api_key)
         search_request = SearchRequest(limit=1)
 
         # Should not raise exception
-        results = client.search_models(search_request)
+        results = await client.search_models(search_request)
         assert isinstance(results, dict)
 
     @pytest.mark.integration
-    def test_large_limit_handling(self, civitai_api_key):
+    async def test_large_limit_handling(self, civitai_api_key):
         """Test client handling of large limit values."""
         client = CivitaiClient(api_token=civitai_api_key)
         search_request = SearchRequest(limit=1000)  # Large limit
 
         # Client should handle this gracefully
         try:
-            results = client.search_models(search_request)
+            results = await client.search_models(search_request)
             assert isinstance(results, dict)
         except Exception as e:
             # If API rejects it, that's acceptable
             assert isinstance(e, Exception)
 
     @pytest.mark.integration
-    def test_invalid_search_parameters(self, civitai_api_key):
+    async def test_invalid_search_parameters(self, civitai_api_key):
         """Test with potentially invalid search parameters."""
         client = CivitaiClient(api_token=civitai_api_key)
 
@@ -181,7 +281,7 @@ class TestClientErrorHandling:
 
         # Should either work or handle gracefully
         try:
-            results = client.search_models(search_request)
+            results = await client.search_models(search_request)
             assert isinstance(results, dict)
         except Exception:
             # API rejection is acceptable for invalid parameters
@@ -194,7 +294,7 @@ class TestClientErrorHandling:
 class TestClientIntegration:
     """Integration tests for the complete client workflow."""
 
-    def test_full_search_workflow(self, civitai_api_key):
+    async def test_full_search_workflow(self, civitai_api_key):
         """Test a complete search workflow."""
         client = CivitaiClient(api_token=civitai_api_key)
 
@@ -202,12 +302,11 @@ class TestClientIntegration:
         search_request = SearchRequest(
             query="test",
             limit=2,
-            page=1,
             sort="Most Downloaded",
             period="AllTime"
         )
 
-        results = client.search_models(search_request)
+        results = await client.search_models(search_request)
 
         # Verify response structure
         assert isinstance(results, dict)
@@ -221,7 +320,7 @@ class TestClientIntegration:
             assert 'name' in first_item
 
     @pytest.mark.slow
-    def test_multiple_consecutive_searches(self, civitai_api_key):
+    async def test_multiple_consecutive_searches(self, civitai_api_key):
         """Test multiple consecutive searches."""
         client = CivitaiClient(api_token=civitai_api_key)
 
@@ -233,21 +332,21 @@ class TestClientIntegration:
                 limit=1
             )
 
-            results = client.search_models(search_request)
+            results = await client.search_models(search_request)
             assert isinstance(results, dict)
             assert 'items' in results
 
-    def test_pagination_support(self, civitai_api_key):
+    async def test_pagination_support(self, civitai_api_key):
         """Test pagination support in client."""
         client = CivitaiClient(api_token=civitai_api_key)
 
         # Test first page
-        page1_request = SearchRequest(limit=1, page=1)
-        page1_results = client.search_models(page1_request)
+        page1_request = SearchRequest(limit=1)
+        page1_results = await client.search_models(page1_request)
 
-        # Test second page
-        page2_request = SearchRequest(limit=1, page=2)
-        page2_results = client.search_models(page2_request)
+        # Test second page, continuing from the first page's cursor
+        page2_request = SearchRequest(limit=1, cursor=page1_results['metadata'].get('nextCursor'))
+        page2_results = await client.search_models(page2_request)
 
         # Both should be valid responses
         assert isinstance(page1_results, dict)
@@ -275,3 +374,419 @@ class TestClientAvailability:
             assert ModelType is not None
         except ImportError:
             pytest.skip("Models module not available - this is acceptable")
+
+
+@skip_if_no_client
+class TestSharedSession:
+    """Test the aiohttp session shared between client instances."""
+
+    async def test_session_shared_between_clients(self):
+        """Test that all clients reuse the same pooled session."""
+        try:
+            first = await CivitaiClient()._get_session()
+            second = await CivitaiClient(api_token="other")._get_session()
+
+            assert first is second
+            assert not first.closed
+        finally:
+            await CivitaiClient.close_session()
+
+    async def test_close_session_recreates_on_next_use(self):
+        """Test that a closed session is replaced lazily."""
+        try:
+            first = await CivitaiClient._get_session()
+            await CivitaiClient.close_session()
+            assert first.closed
+
+            second = await CivitaiClient._get_session()
+            assert second is not first
+            assert not second.closed
+        finally:
+            await CivitaiClient.close_session()
+
+    def test_session_of_finished_loop_is_closed_when_replaced(self):
+        """Test that the session of an earlier event loop is closed, not just dropped."""
+        first = asyncio.run(CivitaiClient._get_session())
+        try:
+            second = asyncio.run(CivitaiClient._get_session())
+
+            assert first.closed
+            assert second is not first
+        finally:
+            asyncio.run(CivitaiClient.close_session())
+
+    def test_get_client_reuses_instance_per_token(self):
+        """Test that get_client hands out one client per API token."""
+        assert get_client("token") is get_client("token")
+        assert get_client("token") is not get_client("other")
+        assert get_client("token").api_token == "token"
+
+
+@skip_if_no_client
+@skip_if_no_aiohttp
+class TestDownloadFileAsync:
+    """Test streaming downloads against a local HTTP server."""
+
+    async def test_download_writes_complete_file(self, file_server, temp_dir, download_payload):
+        """Test that the downloaded file matches the served payload."""
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        url = str(file_server.make_url("/model.safetensors"))
+
+        downloaded = await client.download_file_async(url, target)
+
+        assert downloaded == len(download_payload)
+        with open(target, 'rb') as f:
+            assert f.read() == download_payload
+
+    async def test_progress_callback_reports_final_size(self, file_server, temp_dir, download_payload):
+        """Test that the throttled progress callback always reports completion."""
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        url = str(file_server.make_url("/model.safetensors"))
+        calls = []
+
+        await client.download_file_async(
+            url, target, progress_callback=lambda done, total: calls.append((done, total)))
+
+        assert calls
+        assert calls[-1] == (len(download_payload), len(download_payload))
+
+    async def test_streamed_download_writes_complete_file(self, file_server, temp_dir,
+                                                         download_payload, monkeypatch):
+        """Test the chunked streaming path used for downloads above the small-file threshold."""
+        monkeypatch.setattr(civitai_client, "SMALL_DOWNLOAD_SIZE", 1)
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        url = str(file_server.make_url("/model.safetensors"))
+        calls = []
+
+        downloaded = await client.download_file_async(
+            url, target, progress_callback=lambda done, total: calls.append((done, total)))
+
+        assert downloaded == len(download_payload)
+        assert calls[-1] == (len(download_payload), len(download_payload))
+        with open(target, 'rb') as f:
+            assert f.read() == download_payload
+
+    async def test_large_download_uses_parallel_ranges(self, file_server, temp_dir,
+                                                      download_payload, monkeypatch):
+        """Test that large downloads are fetched as parallel Range requests into one file."""
+        monkeypatch.setattr(civitai_client, "PARALLEL_DOWNLOAD_SIZE", 1)
+        monkeypatch.setattr(civitai_client, "SMALL_DOWNLOAD_SIZE", 1)
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        url = str(file_server.make_url("/model.safetensors"))
+        calls = []
+
+        downloaded = await client.download_file_async(
+            url, target, progress_callback=lambda done, total: calls.append((done, total)))
+
+        assert downloaded == len(download_payload)
+        assert calls[-1] == (len(download_payload), len(download_payload))
+        with open(target, 'rb') as f:
+            assert f.read() == download_payload
+        ranges = [request.headers["Range"] for request in file_server.received if "Range" in request.headers]
+        assert len(ranges) == civitai_client.PARALLEL_DOWNLOAD_PARTS
+
+    async def test_parallel_parts_write_on_download_pool(self, file_server, temp_dir, monkeypatch):
+        """Test that range parts write their chunks on the download I/O pool, not the default executor."""
+        monkeypatch.setattr(civitai_client, "PARALLEL_DOWNLOAD_SIZE", 1)
+        monkeypatch.setattr(civitai_client, "SMALL_DOWNLOAD_SIZE", 1)
+        write_chunk = civitai_client._write_chunk
+        writer_threads = set()
+
+        def recording_write_chunk(*args):
+            writer_threads.add(threading.current_thread().name)
+            write_chunk(*args)
+
+        monkeypatch.setattr(civitai_client, "_write_chunk", recording_write_chunk)
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+
+        await client.download_file_async(str(file_server.make_url("/model.safetensors")), target)
+
+        assert writer_threads
+        assert all(name.startswith("download-io") for name in writer_threads)
+        assert len(writer_threads) <= civitai_client.DOWNLOAD_IO_THREADS
+
+    async def test_cancelled_download_closes_file_after_running_write(self, file_server, temp_dir, monkeypatch):
+        """Test that cancelling a download waits for the running write before closing its file."""
+        monkeypatch.setattr(civitai_client, "SMALL_DOWNLOAD_SIZE", 1)
+        write_chunk = civitai_client._write_chunk
+        close = os.close
+        write_started = threading.Event()
+        release_write = threading.Event()
+        events = []
+
+        def blocking_write_chunk(fd, *args):
+            write_started.set()
+            release_write.wait(5)
+            write_chunk(fd, *args)
+            events.append(("write", fd))
+
+        def recording_close(fd):
+            events.append(("close", fd))
+            close(fd)
+
+        monkeypatch.setattr(civitai_client, "_write_chunk", blocking_write_chunk)
+        monkeypatch.setattr(civitai_client.os, "close", recording_close)
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        download = asyncio.ensure_future(
+            client.download_file_async(str(file_server.make_url("/model.safetensors")), target))
+        while not write_started.is_set():
+            await asyncio.sleep(0.01)
+
+        download.cancel()
+        await asyncio.sleep(0.05)
+        cancelled_before_write_finished = download.done()
+        release_write.set()
+        with pytest.raises(asyncio.CancelledError):
+            await download
+
+        assert not cancelled_before_write_finished
+        write_fd = events[0][1]
+        assert [event for event in events if event[1] == write_fd][-1] == ("close", write_fd)
+
+    async def test_failed_parallel_download_removes_file(self, file_server, temp_dir, monkeypatch):
+        """Test that a failed range download leaves no preallocated file behind to resume."""
+        monkeypatch.setattr(civitai_client, "PARALLEL_DOWNLOAD_SIZE", 1)
+        monkeypatch.setattr(civitai_client, "SMALL_DOWNLOAD_SIZE", 1)
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        url = str(file_server.make_url("/failing-ranges.safetensors"))
+
+        with pytest.raises(Exception, match="Download failed"):
+            await client.download_file_async(url, target)
+
+        assert not os.path.exists(target)
+        assert not os.path.exists(target + civitai_client.RANGES_SUFFIX)
+
+    async def test_parallel_download_is_not_resumable_until_complete(self, file_server, temp_dir,
+                                                                     download_payload, monkeypatch):
+        """Test that parts are written beside the target, so an interrupted download is never resumed by size."""
+        monkeypatch.setattr(civitai_client, "PARALLEL_DOWNLOAD_SIZE", 1)
+        monkeypatch.setattr(civitai_client, "SMALL_DOWNLOAD_SIZE", 1)
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        # Left behind by a process killed during an earlier parallel download
+        with open(target + civitai_client.RANGES_SUFFIX, 'wb') as f:
+            f.truncate(len(download_payload))
+        write_chunk = civitai_client._write_chunk
+        target_seen = []
+
+        def recording_write_chunk(*args):
+            target_seen.append(os.path.exists(target))
+            write_chunk(*args)
+
+        monkeypatch.setattr(civitai_client, "_write_chunk", recording_write_chunk)
+
+        downloaded = await client.download_file_async(
+            str(file_server.make_url("/model.safetensors")), target, resume=True)
+
+        assert downloaded == len(download_payload)
+        assert target_seen and not any(target_seen)
+        assert not os.path.exists(target + civitai_client.RANGES_SUFFIX)
+        with open(target, 'rb') as f:
+            assert f.read() == download_payload
+
+    async def test_resume_continues_partial_file(self, file_server, temp_dir, download_payload):
+        """Test that resuming requests only the missing bytes and appends them."""
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        with open(target, 'wb') as f:
+            f.write(download_payload[:1000])
+        url = str(file_server.make_url("/model.safetensors"))
+        calls = []
+
+        downloaded = await client.download_file_async(
+            url, target, progress_callback=lambda done, total: calls.append((done, total)), resume=True)
+
+        assert downloaded == len(download_payload)
+        assert calls[-1] == (len(download_payload), len(download_payload))
+        assert file_server.received[-1].headers["Range"] == "bytes=1000-"
+        with open(target, 'rb') as f:
+            assert f.read() == download_payload
+
+    async def test_resume_of_complete_file(self, file_server, temp_dir, download_payload):
+        """Test that resuming an already complete file keeps it as is."""
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        with open(target, 'wb') as f:
+            f.write(download_payload)
+        url = str(file_server.make_url("/model.safetensors"))
+
+        downloaded = await client.download_file_async(url, target, resume=True)
+
+        assert downloaded == len(download_payload)
+        with open(target, 'rb') as f:
+            assert f.read() == download_payload
+
+    async def test_resume_restarts_when_server_ignores_range(self, file_server, temp_dir, download_payload):
+        """Test that a full response to a Range request overwrites the partial file."""
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        with open(target, 'wb') as f:
+            f.write(b"stale partial data")
+        url = str(file_server.make_url("/no-ranges.safetensors"))
+
+        downloaded = await client.download_file_async(url, target, resume=True)
+
+        assert downloaded == len(download_payload)
+        with open(target, 'rb') as f:
+            assert f.read() == download_payload
+
+    @pytest.mark.parametrize("small_size, parallel_size", [
+        (64 << 20, 256 << 20),  # single read
+        (1, 256 << 20),         # streamed
+        (1, 1),                 # parallel ranges
+    ])
+    async def test_matching_sha256_is_accepted(self, file_server, temp_dir, download_payload,
+                                               monkeypatch, small_size, parallel_size):
+        """Test that a download with the expected SHA256 succeeds on every download path."""
+        monkeypatch.setattr(civitai_client, "SMALL_DOWNLOAD_SIZE", small_size)
+        monkeypatch.setattr(civitai_client, "PARALLEL_DOWNLOAD_SIZE", parallel_size)
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        url = str(file_server.make_url("/model.safetensors"))
+
+        downloaded = await client.download_file_async(
+            url, target, sha256=hashlib.sha256(download_payload).hexdigest().upper())
+
+        assert downloaded == len(download_payload)
+        assert os.path.exists(target)
+
+    async def test_resumed_download_is_verified(self, file_server, temp_dir, download_payload):
+        """Test that the hash of a resumed download covers the bytes already on disk."""
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        with open(target, 'wb') as f:
+            f.write(download_payload[:1000])
+        url = str(file_server.make_url("/model.safetensors"))
+
+        await client.download_file_async(
+            url, target, resume=True, sha256=hashlib.sha256(download_payload).hexdigest())
+
+        with open(target, 'rb') as f:
+            assert f.read() == download_payload
+
+    async def test_sha256_mismatch_removes_file(self, file_server, temp_dir):
+        """Test that a download with the wrong hash fails and leaves no file behind."""
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "model.safetensors")
+        url = str(file_server.make_url("/model.safetensors"))
+
+        with pytest.raises(ValueError, match="SHA256 mismatch"):
+            await client.download_file_async(url, target, sha256="0" * 64)
+
+        assert not os.path.exists(target)
+
+    async def test_write_error_is_raised(self, file_server, temp_dir):
+        """Test that a failing file write aborts the download with an error."""
+        client = CivitaiClient()
+        target = os.path.join(temp_dir, "missing_dir", "model.safetensors")
+        url = str(file_server.make_url("/model.safetensors"))
+
+        with pytest.raises(FileNotFoundError):
+            await client.download_file_async(url, target)
+
+
+@skip_if_no_client
+@skip_if_no_models
+@skip_if_no_aiohttp
+class TestClientRequests:
+    """Test the requests the client sends, using a local API server."""
+
+    async def test_query_search_uses_cursor_instead_of_page(self, api_server):
+        """Test that query searches send the cursor and no page parameter."""
+        client = CivitaiClient(api_token="secret")
+        await client.search_models(SearchRequest(
+            query="castle", cursor="abc", page=3, nsfw=False, types=[ModelType.LORA, ModelType.VAE]))
+
+        request = api_server.received[-1]
+        assert request.query["query"] == "castle"
+        assert request.query["cursor"] == "abc"
+        assert "page" not in request.query
+        assert request.query["nsfw"] == "false"
+        assert request.query.getall("types") == ["LORA", "VAE"]
+        assert request.headers["Authorization"] == "Bearer secret"
+
+    async def test_browse_search_uses_cursor(self, api_server):
+        """Test that searches without query page with the cursor as well."""
+        client = CivitaiClient()
+        results = await client.search_models(SearchRequest(cursor="def", page=2))
+
+        request = api_server.received[-1]
+        assert request.query["cursor"] == "def"
+        assert "page" not in request.query
+        assert "query" not in request.query
+        assert "Authorization" not in request.headers
+        assert results == {"items": [], "metadata": {}}
+
+    async def test_get_download_url(self, api_server):
+        """Test looking up a file's download URL from its version."""
+        client = CivitaiClient()
+
+        assert await client.get_download_url(10, 42, 2) == "https://example.com/2"
+        with pytest.raises(ValueError):
+            await client.get_download_url(10, 42, 3)
+
+    async def test_get_version_file(self, api_server):
+        """Test looking up a single file's info by id."""
+        client = CivitaiClient()
+
+        file_info = await client.get_version_file(42, 1)
+
+        assert file_info["name"] == "first.safetensors"
+        with pytest.raises(ValueError):
+            await client.get_version_file(42, 3)
+
+    async def test_version_lookups_are_cached(self, api_server):
+        """Test that repeated version lookups reuse the cached response."""
+        client = CivitaiClient()
+
+        await client.get_model_version(42)
+        await client.get_download_url(10, 42, 1)
+
+        assert len(api_server.received) == 1
+
+    async def test_cached_responses_are_not_shared_across_tokens(self, api_server):
+        """Test that a client with another token does not get a cached response."""
+        await CivitaiClient().get_model_version(42)
+        await CivitaiClient(api_token="other").get_model_version(42)
+        await CivitaiClient(api_token="other").get_model_version(42)
+
+        assert len(api_server.received) == 2
+
+
+@pytest.mark.skipif(not CACHE_AVAILABLE, reason="TTLCache not available")
+class TestTTLCache:
+    """Test the metadata response cache."""
+
+    def test_get_returns_stored_value(self):
+        """Test basic set and get."""
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set(1, "one")
+
+        assert cache.get(1) == "one"
+        assert cache.get(2) is None
+
+    def test_expired_entries_are_dropped(self):
+        """Test that entries are not returned after their TTL."""
+        cache = TTLCache(max_size=2, ttl=-1)
+        cache.set(1, "one")
+
+        assert cache.get(1) is None
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that the cache stays within max_size using LRU order."""
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set(1, "one")
+        cache.set(2, "two")
+        cache.get(1)
+        cache.set(3, "three")
+
+        assert cache.get(1) == "one"
+        assert cache.get(2) is None
+        assert cache.get(3) == "three"
@@ -0,0 +1,207 @@
+"""
+Tests for the ConversionManager.
+Tests asynchronous batch conversion of PNG directories into ZIP archives using pytest.
+"""
+
+import os
+import asyncio
+import shutil
+import tempfile
+import zipfile
+import pytest
+from pathlib import Path
+
+# Try to import conversion manager and models
+try:
+    from conversion_manager import ConversionManager
+    from models import ConversionRequest, ConversionStatus
+    CONVERSION_MANAGER_AVAILABLE = True
+except ImportError:
+    CONVERSION_MANAGER_AVAILABLE = False
+
+skip_if_no_conversion_manager = pytest.mark.skipif(
+    not CONVERSION_MANAGER_AVAILABLE,
+    reason="ConversionManager not available"
+)
+
+TEST_IMAGE = Path(__file__).parent / "img.png"
+
+
+@pytest.fixture
+def conversion_manager(temp_dir):
+    """ConversionManager using a temporary mount directory."""
+    manager = ConversionManager(temp_dir)
+    yield manager
+    manager.shutdown()
+
+
+@pytest.fixture
+def image_directory(temp_dir):
+    """Directory with a few InvokeAI images and one image without metadata."""
+    if not TEST_IMAGE.exists():
+        pytest.skip(f"Test input image not found: {TEST_IMAGE}")
+
+    image_dir = os.path.join(temp_dir, "images")
+    os.makedirs(image_dir)
+    for name in ("first.png", "second.png", "third.png"):
+        shutil.copy(TEST_IMAGE, os.path.join(image_dir, name))
+
+    from conftest import create_test_image
+    create_test_image(os.path.join(image_dir, "plain.png"))
+    return image_dir
+
+
+async def run_conversion(manager, request):
+    """Start a conversion and wait for its background task to finish."""
+    conversion_id = await manager.add_conversion(request)
+    task = manager.active_conversions.get(conversion_id)
+    if task:
+        await task
+    return manager.get_conversion_status(conversion_id)
+
+
+@skip_if_no_conversion_manager
+class TestConversionManager:
+    """Test batch conversion through the ConversionManager."""
+
+    async def test_conversion_creates_zip(self, conversion_manager, image_directory):
+        """Test that all convertible images end up in the ZIP."""
+        info = await run_conversion(
+            conversion_manager, ConversionRequest(directory=image_directory, auto_sort=False))
+
+        assert info.status == ConversionStatus.COMPLETED
+        assert info.processed_files == 4
+        assert info.progress == 100.0
+
+        with zipfile.ZipFile(info._zip_path) as zipf:
+            names = set(zipf.namelist())
+
+        assert {"first_a1111.png", "second_a1111.png", "third_a1111.png"} <= names
+        # The image without InvokeAI metadata is reported in the summary
+        assert "conversion_summary.txt" in names
+
+    async def test_auto_sort_conversion_creates_zip(self, conversion_manager, image_directory):
+        """Test that staged, auto-sorted conversions still end up in the ZIP."""
+        info = await run_conversion(
+            conversion_manager, ConversionRequest(directory=image_directory, auto_sort=True))
+
+        assert info.status == ConversionStatus.COMPLETED
+
+        with zipfile.ZipFile(info._zip_path) as zipf:
+            names = {os.path.basename(name) for name in zipf.namelist()}
+            assert zipf.testzip() is None
+            # Small staged files get plain headers without ZIP64 extra fields
+            assert all(entry.extra == b"" for entry in zipf.infolist())
+
+        assert {"first_a1111.png", "second_a1111.png", "third_a1111.png"} <= names
+        # Staged files are removed once they are archived
+        assert os.listdir(os.path.dirname(info._zip_path)) == [os.path.basename(info._zip_path)]
+
+    async def test_only_png_files_are_counted(self, conversion_manager, image_directory):
+        """Test that non-PNG files and directories are not picked up."""
+        os.makedirs(os.path.join(image_directory, "folder.png"))
+        with open(os.path.join(image_directory, "notes.txt"), 'w') as f:
+            f.write("not an image")
+
+        info = await run_conversion(
+            conversion_manager, ConversionRequest(directory=image_directory, auto_sort=False))
+
+        assert info.total_files == 4
+
+    async def test_missing_directory_raises(self, conversion_manager, temp_dir):
+        """Test that a missing directory is rejected up front."""
+        with pytest.raises(ValueError):
+            await conversion_manager.add_conversion(
+                ConversionRequest(directory=os.path.join(temp_dir, "missing")))
+
+    async def test_directory_without_png_raises(self, conversion_manager, temp_dir):
+        """Test that a directory without PNG files is rejected up front."""
+        with pytest.raises(ValueError):
+            await conversion_manager.add_conversion(ConversionRequest(directory=temp_dir))
+
+
+@skip_if_no_conversion_manager
+class TestCleanupOldConversions:
+    """Test removal of old conversions."""
+
+    async def test_old_finished_conversions_are_removed(self, conversion_manager, image_directory):
+        """Test that finished conversions past max age are removed with their ZIP."""
+        info = await run_conversion(
+            conversion_manager, ConversionRequest(directory=image_directory, auto_sort=False))
+        zip_dir = os.path.dirname(info._zip_path)
+
+        info.start_ts -= 2 * 3600
+        await conversion_manager.cleanup_old_conversions(max_age_hours=1)
+
+        assert conversion_manager.get_conversion_status(info.id) is None
+        assert not os.path.exists(zip_dir)
+
+    async def test_cancelled_conversion_removes_temp_dir(self, conversion_manager, image_directory,
+                                                         temp_dir, monkeypatch):
+        """Test that cancelling a running conversion deletes its temporary directory."""
+        work_dir = os.path.join(temp_dir, "work")
+        os.makedirs(work_dir)
+        real_mkdtemp = tempfile.mkdtemp
+        monkeypatch.setattr(tempfile, "mkdtemp", lambda: real_mkdtemp(dir=work_dir))
+        sorting = asyncio.Event()
+
+        async def never_finish_sorting(directory):
+            sorting.set()
+            await asyncio.Event().wait()
+
+        monkeypatch.setattr(conversion_manager, "_sort_images", never_finish_sorting)
+        conversion_id = await conversion_manager.add_conversion(
+            ConversionRequest(directory=image_directory, auto_sort=True))
+        task = conversion_manager.active_conversions[conversion_id]
+
+        await sorting.wait()
+        conversion_manager.cancel_conversion(conversion_id)
+        await task
+
+        assert os.listdir(work_dir) == []
+
+    async def test_recent_conversions_are_kept(self, conversion_manager, image_directory):
+        """Test that conversions younger than max age are kept."""
+        info = await run_conversion(
+            conversion_manager, ConversionRequest(directory=image_directory, auto_sort=False))
+
+        await conversion_manager.cleanup_old_conversions(max_age_hours=1)
+
+        assert conversion_manager.get_conversion_status(info.id) is info
+        assert os.path.exists(info._zip_path)
+
+
+@skip_if_no_conversion_manager
+class TestConversionEviction:
+    """Test the bound on tracked conversions."""
+
+    async def test_least_recently_used_finished_conversion_is_evicted(self, temp_dir, image_directory):
+        """Test that exceeding max_conversions drops the least recently used finished entry."""
+        manager = ConversionManager(temp_dir, max_conversions=2)
+        try:
+            request = ConversionRequest(directory=image_directory, auto_sort=False)
+            first = await run_conversion(manager, request)
+            second = await run_conversion(manager, request)
+
+            # Looking up the first conversion makes the second the least recently used
+            manager.get_conversion_status(first.id)
+            third = await run_conversion(manager, request)
+
+            assert list(manager.conversions) == [first.id, third.id]
+            assert not os.path.exists(os.path.dirname(second._zip_path))
+        finally:
+            manager.shutdown()
+
+    async def test_running_conversions_are_not_evicted(self, temp_dir, image_directory):
+        """Test that unfinished conversions stay tracked even above max_conversions."""
+        manager = ConversionManager(temp_dir, max_conversions=1)
+        try:
+            request = ConversionRequest(directory=image_directory, auto_sort=False)
+            first_id = await manager.add_conversion(request)
+            second_id = await manager.add_conversion(request)
+
+            assert set(manager.conversions) == {first_id, second_id}
+            for task in list(manager.active_conversions.values()):
+                await task
+        finally:
+            manager.shutdown()
@@ -0,0 +1,120 @@
+"""
+Tests for the /api/download-converted-images endpoint.
+Tests converting a directory of PNG images into a ZIP download using pytest.
+"""
+
+import io
+import os
+import shutil
+import zipfile
+import pytest
+from pathlib import Path
+
+from conftest import MAIN_AVAILABLE, skip_if_no_main
+
+if MAIN_AVAILABLE:
+    import main
+    from main import download_converted_images
+    from conversion_manager import ConversionManager
+    from fastapi import HTTPException
+
+TEST_IMAGE = Path(__file__).parent / "img.png"
+
+
+@pytest.fixture
+def conversion_manager(temp_dir, monkeypatch):
+    """ConversionManager used by the endpoint."""
+    manager = ConversionManager(temp_dir)
+    monkeypatch.setattr(main, "conversion_manager", manager)
+    yield manager
+    manager.shutdown()
+
+
+@pytest.fixture
+def image_directory(temp_dir):
+    """Directory with two InvokeAI images and one image without metadata."""
+    if not TEST_IMAGE.exists():
+        pytest.skip(f"Test input image not found: {TEST_IMAGE}")
+
+    image_dir = os.path.join(temp_dir, "images")
+    os.makedirs(image_dir)
+    for name in ("first.png", "second.png"):
+        shutil.copy(TEST_IMAGE, os.path.join(image_dir, name))
+
+    from conftest import create_test_image
+    create_test_image(os.path.join(image_dir, "plain.png"))
+    # Neither a directory named like a PNG nor other files are picked up
+    os.makedirs(os.path.join(image_dir, "folder.png"))
+    shutil.copy(TEST_IMAGE, os.path.join(image_dir, "copy.jpg"))
+    return image_dir
+
+
+@skip_if_no_main()
+class TestConvertedImagesEndpoint:
+    """Test the synchronous directory conversion download."""
+
+    async def test_converted_images_are_zipped(self, conversion_manager, image_directory):
+        """Test that convertible images and an error summary end up in the ZIP."""
+        response = await download_converted_images(directory=image_directory)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+        with zipfile.ZipFile(io.BytesIO(body)) as zipf:
+            names = set(zipf.namelist())
+            assert zipf.testzip() is None
+            compression = {info.filename: info.compress_type for info in zipf.infolist()}
+
+        assert compression["first_a1111.png"] == zipfile.ZIP_STORED
+        assert compression["conversion_summary.txt"] == zipfile.ZIP_DEFLATED
+
+        assert response.media_type == "application/zip"
+        assert names == {"first_a1111.png", "second_a1111.png", "conversion_summary.txt"}
+
+    async def test_conversions_in_flight_are_bounded(self, conversion_manager, image_directory, monkeypatch):
+        """Test that no more than CONVERT_WINDOW images are converted or held at a time."""
+        monkeypatch.setattr(main, "CONVERT_WINDOW", 1)
+        convert_file = conversion_manager.convert_file
+        in_flight = 0
+        max_in_flight = 0
+
+        async def counting_convert_file(png_file):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            try:
+                return await convert_file(png_file)
+            finally:
+                in_flight -= 1
+
+        monkeypatch.setattr(conversion_manager, "convert_file", counting_convert_file)
+        response = await download_converted_images(directory=image_directory)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+        with zipfile.ZipFile(io.BytesIO(body)) as zipf:
+            assert set(zipf.namelist()) == {"first_a1111.png", "second_a1111.png", "conversion_summary.txt"}
+        assert max_in_flight == 1
+
+    async def test_no_convertible_images_returns_422(self, conversion_manager, temp_dir):
+        """Test that the error status is sent when no image could be converted."""
+        from conftest import create_test_image
+        create_test_image(os.path.join(temp_dir, "plain.png"))
+
+        with pytest.raises(HTTPException) as exc_info:
+            await download_converted_images(directory=temp_dir)
+
+        assert exc_info.value.status_code == 422
+
+    async def test_too_many_files_returns_413(self, conversion_manager, image_directory, monkeypatch):
+        """Test that directories above MAX_CONVERT_FILES are rejected before converting."""
+        monkeypatch.setattr(main, "MAX_CONVERT_FILES", 2)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await download_converted_images(directory=image_directory)
+
+        assert exc_info.value.status_code == 413
+
+    async def test_missing_directory_returns_404(self, conversion_manager, temp_dir):
+        """Test that a missing directory is reported as not found."""
+        with pytest.raises(HTTPException) as exc_info:
+            await download_converted_images(directory=os.path.join(temp_dir, "missing"))
+
+        assert exc_info.value.status_code == 404
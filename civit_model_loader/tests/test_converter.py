@@ -4,14 +4,16 @@ Tests the convert_invokeai_to_a1111 function and related functionality using pyt
 """
 
 import os
+import json
 import tempfile
 import pytest
+from io import BytesIO
 from pathlib import Path
 from PIL import Image
 
 # Try to import converter functions
 try:
-    from converter import convert_invokeai_to_a1111, convert_image_metadata
+    from converter import convert_invokeai_to_a1111, convert_image_metadata, convert_invokeai_to_a1111_bytes, save_model_hash
     CONVERTER_AVAILABLE = True
 except ImportError:
     CONVERTER_AVAILABLE = False
@@ -36,11 +38,12 @@ class TestConverterBasicFunctionality:
         assert convert_invokeai_to_a1111.__doc__ is not None
         assert convert_image_metadata.__doc__ is not None
 
-    def test_error_handling_nonexistent_file(self):
+    def test_error_handling_nonexistent_file(self, temp_dir):
         """Test error handling with non-existent input file."""
         success, message = convert_invokeai_to_a1111(
             "non_existent.png",
-            "output.png"
+            os.path.join(temp_dir, "output.png"),
+            temp_dir
         )
 
         assert not success
@@ -108,7 +111,8 @@ class TestExistingTestImages:
 
         success, message = convert_invokeai_to_a1111(
             str(input_path),
-            output_path
+            output_path,
+            temp_dir
         )
 
         if success:
@@ -125,6 +129,37 @@ class TestExistingTestImages:
             pytest.skip(
                 f"Conversion failed (expected in test environment): {message}")
 
+    def test_in_memory_conversion_matches_file_conversion(self, test_images_paths, temp_dir):
+        """Test that in-memory conversion produces the same PNG as file conversion."""
+        input_path = test_images_paths['input']
+        if not input_path.exists():
+            pytest.skip("Input test image not found")
+
+        output_path = os.path.join(temp_dir, "converted_output.png")
+        file_success, message = convert_invokeai_to_a1111(
+            str(input_path), output_path, temp_dir)
+        if not file_success:
+            pytest.skip(
+                f"Conversion failed (expected in test environment): {message}")
+
+        success, message, png_data = convert_invokeai_to_a1111_bytes(
+            str(input_path), temp_dir)
+
+        assert success
+        with open(output_path, 'rb') as f:
+            assert png_data == f.read()
+        with Image.open(BytesIO(png_data)) as converted_img:
+            converted_img.load()
+            assert 'parameters' in converted_img.info
+
+    def test_in_memory_conversion_failure_returns_no_data(self, temp_dir):
+        """Test that a failed in-memory conversion returns empty data."""
+        success, message, png_data = convert_invokeai_to_a1111_bytes(
+            "non_existent.png", temp_dir)
+
+        assert not success
+        assert png_data == b""
+
 
 @skip_if_no_converter
 class TestConverterWithCustomConfig:
@@ -166,15 +201,52 @@ class TestConverterWithCustomConfig:
         assert len(message) > 0
 
 
+@skip_if_no_converter
+class TestHashCache:
+    """Test persisting model hashes to hash_cache.json."""
+
+    def read_cache(self, cache_dir):
+        with open(os.path.join(cache_dir, "hash_cache.json")) as f:
+            return json.load(f)
+
+    def test_saved_hash_is_merged_with_file(self, temp_dir):
+        """Test that hashes written by another process are kept when saving."""
+        save_model_hash("other.safetensors", "1111111111", {}, temp_dir)
+
+        hash_cache = {}
+        save_model_hash("model.safetensors", "2222222222", hash_cache, temp_dir)
+
+        expected = {"other.safetensors": "1111111111", "model.safetensors": "2222222222"}
+        assert self.read_cache(temp_dir) == expected
+        assert hash_cache == expected
+        assert not [name for name in os.listdir(temp_dir) if name.endswith(".tmp")]
+
+    def test_cached_hash_is_not_rewritten(self, temp_dir):
+        """Test that saving an already cached hash does not touch the file."""
+        save_model_hash("model.safetensors", "2222222222", {"model.safetensors": "2222222222"}, temp_dir)
+
+        assert not os.path.exists(os.path.join(temp_dir, "hash_cache.json"))
+
+    def test_corrupt_cache_file_is_replaced(self, temp_dir):
+        """Test that an unreadable cache file is overwritten with valid JSON."""
+        with open(os.path.join(temp_dir, "hash_cache.json"), "w") as f:
+            f.write('{"truncated": ')
+
+        save_model_hash("model.safetensors", "2222222222", {}, temp_dir)
+
+        assert self.read_cache(temp_dir) == {"model.safetensors": "2222222222"}
+
+
 @skip_if_no_converter
 class TestErrorHandling:
     """Test error handling scenarios."""
 
-    def test_invalid_input_path(self):
+    def test_invalid_input_path(self, temp_dir):
         """Test with invalid input path."""
         success, message = convert_invokeai_to_a1111(
             "",
-            "output.png"
+            os.path.join(temp_dir, "output.png"),
+            temp_dir
         )
 
         assert not success
@@ -192,7 +264,8 @@ class TestErrorHandling:
 
         success, message = convert_invokeai_to_a1111(
             test_img_path,
-            invalid_output
+            invalid_output,
+            temp_dir
         )
 
         # Should handle this gracefully
@@ -210,7 +283,8 @@ class TestErrorHandling:
 
         success, message = convert_invokeai_to_a1111(
             test_img_path,
-            output_path
+            output_path,
+            temp_dir
         )
 
         # Should handle missing metadata gracefully
@@ -255,10 +329,11 @@ class TestIntegration:
 
         output_path = os.path.join(temp_dir, "integration_test_output.png")
 
-        # Test with default configuration
+        # Test with default configuration, keeping the hash cache out of the source tree
         success, message = convert_invokeai_to_a1111(
             str(input_img),
-            output_path
+            output_path,
+            temp_dir
         )
 
         # This is an integration test - log results but don't fail on expected issues
@@ -0,0 +1,56 @@
+"""
+Tests for the CORS configuration of the API.
+Tests CORS headers of preflight and simple requests using pytest.
+"""
+
+from conftest import MAIN_AVAILABLE, skip_if_no_main
+
+if MAIN_AVAILABLE:
+    from main import app
+
+
+async def call_app(method, path, headers):
+    """Send a request through the ASGI app and return the status and response headers."""
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    return start["status"], {name.decode(): value.decode() for name, value in start["headers"]}
+
+
+@skip_if_no_main()
+class TestCors:
+    """Test cross-origin access to the API."""
+
+    async def test_preflight_allows_json_post(self):
+        """Test that a preflight for a JSON POST is answered for any origin."""
+        status, headers = await call_app("OPTIONS", "/api/search", {
+            "Origin": "http://example.com",
+            "Access-Control-Request-Method": "POST",
+            "Access-Control-Request-Headers": "content-type",
+        })
+
+        assert status == 200
+        assert headers["access-control-allow-origin"] == "*"
+        assert "POST" in headers["access-control-allow-methods"]
+
+    async def test_simple_request_gets_wildcard_origin(self):
+        """Test that simple requests get the wildcard origin without credentials."""
+        status, headers = await call_app("GET", "/api/health", {"Origin": "http://example.com"})
+
+        assert status == 200
+        assert headers["access-control-allow-origin"] == "*"
+        assert "access-control-allow-credentials" not in headers
@@ -0,0 +1,202 @@
+"""
+Tests for the DownloadManager.
+Tests download scheduling and file handling with the Civitai client calls stubbed out using pytest.
+"""
+
+import os
+import asyncio
+import pytest
+
+# Try to import download manager and models
+try:
+    from download_manager import DownloadManager
+    from civitai_client import CivitaiClient
+    from models import DownloadRequest, DownloadStatus
+    DOWNLOAD_MANAGER_AVAILABLE = True
+except ImportError:
+    DOWNLOAD_MANAGER_AVAILABLE = False
+
+skip_if_no_download_manager = pytest.mark.skipif(
+    not DOWNLOAD_MANAGER_AVAILABLE,
+    reason="DownloadManager not available"
+)
+
+
+@pytest.fixture
+def fake_civitai(monkeypatch):
+    """Replace the Civitai calls of the client with local fakes.
+
+    Downloads block until the returned event is set and record their URLs.
+    """
+    release = asyncio.Event()
+    started = []
+
+    async def get_version_file(self, version_id, file_id):
+        return {
+            "id": file_id,
+            "name": f"model_{file_id}.safetensors",
+            "sizeKB": 1,
+            "downloadUrl": f"https://example.com/{file_id}",
+        }
+
+    async def download_file_async(self, download_url, file_path, progress_callback=None,
+                                  api_token=None, resume=False, sha256=None):
+        started.append((download_url, file_path))
+        await release.wait()
+        with open(file_path, 'wb') as f:
+            f.write(b"model data")
+        return len(b"model data")
+
+    monkeypatch.setattr(CivitaiClient, "get_version_file", get_version_file)
+    monkeypatch.setattr(CivitaiClient, "download_file_async", download_file_async)
+    release.started = started
+    return release
+
+
+async def wait_for_downloads(manager):
+    """Wait for all background download tasks to finish."""
+    await asyncio.gather(*manager.active_downloads.values())
+
+
+def download_request(file_id):
+    return DownloadRequest(civitai_model_id=1, version_id=2, file_id=file_id, api_token="token")
+
+
+@skip_if_no_download_manager
+class TestParallelDownloads:
+    """Test the limit on concurrently running downloads."""
+
+    async def test_downloads_beyond_limit_stay_pending(self, temp_dir, fake_civitai):
+        """Test that only max_parallel_downloads downloads run at once."""
+        manager = DownloadManager(temp_dir, max_parallel_downloads=1)
+        first_id = await manager.add_download(download_request(1))
+        second_id = await manager.add_download(download_request(2))
+
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        assert len(fake_civitai.started) == 1
+        assert manager.get_download_status(first_id).status == DownloadStatus.DOWNLOADING
+        assert manager.get_download_status(second_id).status == DownloadStatus.PENDING
+
+        fake_civitai.set()
+        await wait_for_downloads(manager)
+
+        assert manager.get_download_status(first_id).status == DownloadStatus.COMPLETED
+        assert manager.get_download_status(second_id).status == DownloadStatus.COMPLETED
+
+    async def test_cancel_while_waiting_for_slot(self, temp_dir, fake_civitai):
+        """Test that a download waiting for a slot can be cancelled."""
+        manager = DownloadManager(temp_dir, max_parallel_downloads=1)
+        first_id = await manager.add_download(download_request(1))
+        second_id = await manager.add_download(download_request(2))
+        await asyncio.sleep(0)
+
+        assert manager.cancel_download(second_id)
+        fake_civitai.set()
+        await wait_for_downloads(manager)
+
+        assert manager.get_download_status(first_id).status == DownloadStatus.COMPLETED
+        assert manager.get_download_status(second_id).status == DownloadStatus.FAILED
+        assert len(fake_civitai.started) == 1
+
+
+@skip_if_no_download_manager
+class TestDownloadFiles:
+    """Test where downloads are written."""
+
+    async def test_download_is_renamed_from_part_file(self, temp_dir, fake_civitai):
+        """Test that downloads go to a .part file which is renamed on completion."""
+        manager = DownloadManager(temp_dir)
+        fake_civitai.set()
+        download_id = await manager.add_download(download_request(1))
+        await wait_for_downloads(manager)
+
+        info = manager.get_download_status(download_id)
+        models_dir = os.path.join(temp_dir, "models")
+        assert info.status == DownloadStatus.COMPLETED
+        assert fake_civitai.started[0][1] == os.path.join(models_dir, "model_1.safetensors.part")
+        assert os.listdir(models_dir) == ["model_1.safetensors"]
+
+    async def test_completed_download_refreshes_model_files(self, temp_dir, fake_civitai):
+        """Test that a finished download shows up in the cached models directory listing."""
+        manager = DownloadManager(temp_dir)
+        assert await manager.get_model_files() == frozenset()
+
+        fake_civitai.set()
+        await manager.add_download(download_request(1))
+        await wait_for_downloads(manager)
+
+        assert await manager.get_model_files() == {"model_1.safetensors"}
+
+    async def test_wait_for_change_returns_new_revision(self, temp_dir, fake_civitai):
+        """Test that waiting for a change wakes up once a download is added."""
+        manager = DownloadManager(temp_dir)
+        initial = manager.revision
+        waiter = asyncio.ensure_future(manager.wait_for_change(initial))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        fake_civitai.set()
+        await manager.add_download(download_request(1))
+
+        assert await asyncio.wait_for(waiter, timeout=5) > initial
+        await wait_for_downloads(manager)
+
+    async def test_revision_changes_with_download_status(self, temp_dir, fake_civitai):
+        """Test that adding and finishing a download bump the listing revision."""
+        manager = DownloadManager(temp_dir)
+        initial = manager.revision
+        await manager.add_download(download_request(1))
+        added = manager.revision
+
+        fake_civitai.set()
+        await wait_for_downloads(manager)
+
+        assert initial < added < manager.revision
+
+
+@skip_if_no_download_manager
+class TestDownloadEviction:
+    """Test the bound on tracked downloads."""
+
+    async def test_least_recently_used_finished_download_is_evicted(self, temp_dir, fake_civitai):
+        """Test that exceeding max_downloads drops the least recently used finished entry."""
+        manager = DownloadManager(temp_dir, max_downloads=2)
+        fake_civitai.set()
+        first_id = await manager.add_download(download_request(1))
+        second_id = await manager.add_download(download_request(2))
+        await wait_for_downloads(manager)
+
+        # Looking up the first download makes the second the least recently used
+        manager.get_download_status(first_id)
+        third_id = await manager.add_download(download_request(3))
+        await wait_for_downloads(manager)
+
+        assert list(manager.get_all_downloads()) == [first_id, third_id]
+        assert manager.get_download_status(second_id) is None
+
+    async def test_unfinished_downloads_are_not_evicted(self, temp_dir, fake_civitai):
+        """Test that pending and running downloads stay tracked even above max_downloads."""
+        manager = DownloadManager(temp_dir, max_downloads=1)
+        first_id = await manager.add_download(download_request(1))
+        second_id = await manager.add_download(download_request(2))
+
+        assert set(manager.get_all_downloads()) == {first_id, second_id}
+        fake_civitai.set()
+        await wait_for_downloads(manager)
+
+
+@skip_if_no_download_manager
+class TestDownloadIds:
+    """Test the ids assigned to downloads."""
+
+    async def test_ids_sort_by_creation_time(self, temp_dir, fake_civitai):
+        """Test that download ids sort in the order the downloads were added."""
+        manager = DownloadManager(temp_dir)
+        fake_civitai.set()
+        download_ids = [await manager.add_download(download_request(file_id)) for file_id in range(5)]
+        await wait_for_downloads(manager)
+
+        assert sorted(download_ids) == download_ids
+        assert len(set(download_ids)) == 5
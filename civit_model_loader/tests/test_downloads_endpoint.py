@@ -0,0 +1,130 @@
+"""
+Tests for the /api/downloads endpoint.
+Tests conditional and compressed download listings using pytest.
+"""
+
+import asyncio
+import gzip
+import json
+import pytest
+
+from conftest import MAIN_AVAILABLE, skip_if_no_main, make_request
+
+if MAIN_AVAILABLE:
+    import main
+    from main import app, get_all_downloads
+    from download_manager import DownloadManager
+    from models import DownloadInfo, DownloadStatus
+
+
+def add_download(manager, download_id):
+    manager.downloads[download_id] = DownloadInfo(
+        id=download_id,
+        civitai_model_id=1,
+        version_id=2,
+        file_id=3,
+        filename=f"{download_id}.safetensors",
+        status=DownloadStatus.COMPLETED,
+    )
+
+
+@skip_if_no_main()
+class TestDownloadsEndpoint:
+    """Test polling the download listing."""
+
+    @pytest.fixture
+    def manager(self, temp_dir, monkeypatch):
+        manager = DownloadManager(temp_dir)
+        add_download(manager, "first")
+        monkeypatch.setattr(main, "download_manager", manager)
+        return manager
+
+    async def test_unchanged_listing_returns_not_modified(self, manager):
+        """Test that a poll with the current ETag gets a 304 without a body."""
+        etag = (await get_all_downloads(make_request("/api/downloads"))).headers["etag"]
+
+        response = await get_all_downloads(make_request("/api/downloads", {"If-None-Match": etag}))
+
+        assert response.status_code == 304
+        assert response.body == b""
+
+    async def test_changed_listing_returns_new_etag(self, manager):
+        """Test that a change to the downloads invalidates the previous ETag."""
+        etag = (await get_all_downloads(make_request("/api/downloads"))).headers["etag"]
+        manager._revision += 1
+
+        response = await get_all_downloads(make_request("/api/downloads", {"If-None-Match": etag}))
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert list(json.loads(response.body)) == ["first"]
+
+    async def test_etag_from_before_restart_does_not_match(self, manager, monkeypatch):
+        """Test that an ETag of an earlier process with the same revision gets the full listing."""
+        etag = (await get_all_downloads(make_request("/api/downloads"))).headers["etag"]
+        monkeypatch.setattr(main, "BOOT_ID", "restarted")
+
+        response = await get_all_downloads(make_request("/api/downloads", {"If-None-Match": etag}))
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    async def test_listing_is_reused_until_revision_changes(self, manager):
+        """Test that the serialized listing is only rebuilt after the revision changes."""
+        first = await get_all_downloads(make_request("/api/downloads"))
+        add_download(manager, "unannounced")
+        cached = await get_all_downloads(make_request("/api/downloads"))
+        manager._revision += 1
+        rebuilt = await get_all_downloads(make_request("/api/downloads"))
+
+        assert cached.body == first.body
+        assert list(json.loads(rebuilt.body)) == ["first", "unannounced"]
+
+    async def test_large_listing_is_gzipped(self, manager):
+        """Test that large listings are compressed for clients accepting gzip."""
+        for index in range(20):
+            add_download(manager, f"download_{index}")
+        manager._revision += 1
+
+        response = await get_all_downloads(make_request("/api/downloads", {"Accept-Encoding": "gzip, deflate"}))
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(json.loads(gzip.decompress(response.body))) == 21
+
+    async def test_small_listing_is_not_gzipped(self, manager):
+        """Test that small listings are sent uncompressed."""
+        response = await get_all_downloads(make_request("/api/downloads", {"Accept-Encoding": "gzip"}))
+
+        assert "content-encoding" not in response.headers
+        assert list(json.loads(response.body)) == ["first"]
+
+
+@skip_if_no_main()
+class TestDownloadsWebSocket:
+    """Test pushing the download listing over a WebSocket."""
+
+    @pytest.fixture
+    def manager(self, temp_dir, monkeypatch):
+        manager = DownloadManager(temp_dir)
+        add_download(manager, "first")
+        monkeypatch.setattr(main, "download_manager", manager)
+        monkeypatch.setattr(main, "DOWNLOADS_PUSH_INTERVAL", 0)
+        return manager
+
+    async def test_listing_is_pushed_on_change(self, manager):
+        """Test that the listing is sent on connect and again after a download changes."""
+        incoming = asyncio.Queue()
+        outgoing = asyncio.Queue()
+        scope = {"type": "websocket", "path": "/ws/downloads", "headers": [], "query_string": b""}
+        connection = asyncio.ensure_future(app(scope, incoming.get, outgoing.put))
+
+        await incoming.put({"type": "websocket.connect"})
+        assert (await outgoing.get())["type"] == "websocket.accept"
+        assert list(json.loads((await outgoing.get())["text"])) == ["first"]
+
+        add_download(manager, "second")
+        manager._mark_changed()
+        assert list(json.loads((await outgoing.get())["text"])) == ["first", "second"]
+
+        await incoming.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(connection, timeout=5)
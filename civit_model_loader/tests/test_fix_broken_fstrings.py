@@ -0,0 +1,67 @@
+"""
+Tests for scripts/fix_broken_fstrings.py.
+Tests joining f-strings that autopep8 broke across lines using pytest.
+"""
+
+import os
+import pytest
+
+from conftest import create_test_text_file
+
+from scripts.fix_broken_fstrings import fix_broken_fstrings, fix_broken_fstring_in_file, find_python_files
+
+
+class TestFixBrokenFstrings:
+    """Test joining broken f-strings in source text."""
+
+    @pytest.mark.parametrize("broken, fixed", [
+        # The example from the script's docstring
+        ('x = f"data:image/jpeg;base64,{\n    thumbnail_base64}"\n',
+         'x = f"data:image/jpeg;base64,{thumbnail_base64}"\n'),
+        # Blank lines between the parts and code after the closing quote
+        ('x = f"{\n\n    value}"  # comment\n',
+         'x = f"{value}"  # comment\n'),
+        # A string broken at more than one placeholder
+        ('logger.info(f"a {\n    b} c {\n    d} e")\n',
+         'logger.info(f"a {b} c {d} e")\n'),
+    ])
+    def test_broken_fstrings_are_joined(self, broken, fixed):
+        """Test that the parts of a broken f-string are joined onto the first line."""
+        assert fix_broken_fstrings(broken) == fixed
+
+    @pytest.mark.parametrize("content", [
+        'x = f"{a}"\ny = "{"\n',
+        'x = f"{a} {b}"\n',
+        'x = f"{ {1: 2}[1]}"\n',
+        # Never closed, so there is nothing to join
+        'x = f"open {\n',
+        # The next line closes a string but no placeholder
+        'x = f"{"\nfoo\n',
+    ])
+    def test_valid_content_is_unchanged(self, content):
+        """Test that content without broken f-strings is returned as is."""
+        assert fix_broken_fstrings(content) == content
+
+    def test_file_is_rewritten_only_when_fixed(self, temp_dir):
+        """Test that only files with broken f-strings are written."""
+        broken_path = create_test_text_file(os.path.join(temp_dir, "broken.py"), 'x = f"{\n    value}"\n')
+        valid_path = create_test_text_file(os.path.join(temp_dir, "valid.py"), 'x = f"{value}"\n')
+
+        assert fix_broken_fstring_in_file(broken_path)
+        assert not fix_broken_fstring_in_file(valid_path)
+        with open(broken_path) as f:
+            assert f.read() == 'x = f"{value}"\n'
+
+
+class TestFindPythonFiles:
+    """Test finding the files to check."""
+
+    def test_skipped_directories_are_not_searched(self, temp_dir):
+        """Test that hidden, cache and dependency directories are left out."""
+        for directory in ("src", ".git", "__pycache__", "venv", "node_modules"):
+            os.makedirs(os.path.join(temp_dir, directory))
+            create_test_text_file(os.path.join(temp_dir, directory, "module.py"))
+        create_test_text_file(os.path.join(temp_dir, "main.py"))
+        create_test_text_file(os.path.join(temp_dir, "notes.txt"))
+
+        assert sorted(find_python_files(temp_dir)) == ["main.py", os.path.join("src", "module.py")]
@@ -0,0 +1,46 @@
+"""
+Tests for the / frontend endpoint.
+Tests conditional requests for index.html using pytest.
+"""
+
+from pathlib import Path
+import pytest
+
+from conftest import MAIN_AVAILABLE, skip_if_no_main, make_request
+
+if MAIN_AVAILABLE:
+    from main import root
+
+APP_DIR = Path(__file__).parent.parent
+
+
+@skip_if_no_main()
+class TestIndexEndpoint:
+    """Test serving index.html with ETag revalidation."""
+
+    @pytest.fixture(autouse=True)
+    def app_dir(self, monkeypatch):
+        monkeypatch.chdir(APP_DIR)
+
+    async def test_index_is_served_with_etag(self):
+        """Test that the page is served with an ETag and revalidation policy."""
+        response = await root(make_request("/"))
+
+        assert response.status_code == 200
+        assert response.headers["etag"]
+        assert response.headers["cache-control"] == "no-cache"
+
+    async def test_matching_etag_returns_not_modified(self):
+        """Test that a repeat request with the current ETag gets a 304."""
+        etag = (await root(make_request("/"))).headers["etag"]
+
+        response = await root(make_request("/", {"If-None-Match": f'"{etag}"'}))
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+
+    async def test_stale_etag_returns_page(self):
+        """Test that an outdated ETag gets the full page."""
+        response = await root(make_request("/", {"If-None-Match": '"outdated"'}))
+
+        assert response.status_code == 200
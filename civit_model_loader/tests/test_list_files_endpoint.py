@@ -11,10 +11,12 @@ from pathlib import Path
 
 from conftest import (
     skip_if_no_models,
-    skip_if_no_fastapi,
+    skip_if_no_main,
     create_test_image,
     create_test_text_file,
-    MODELS_AVAILABLE
+    make_request,
+    MODELS_AVAILABLE,
+    MAIN_AVAILABLE
 )
 
 if MODELS_AVAILABLE:
@@ -27,12 +29,22 @@ try:
 except ImportError:
     THUMBNAIL_AVAILABLE = False
 
-try:
-    from main import list_files
+if MAIN_AVAILABLE:
+    from main import list_files, stream_files
     from fastapi import HTTPException
-    FASTAPI_AVAILABLE = True
-except ImportError:
-    FASTAPI_AVAILABLE = False
+
+
+async def list_files_response(folder, inline_thumbs=False):
+    """Call the endpoint and parse its JSON response."""
+    response = await list_files(make_request("/api/list-files"), folder=folder, inline_thumbs=inline_thumbs)
+    return ListFilesResponse.model_validate_json(response.body)
+
+
+async def stream_files_lines(folder):
+    """Call the streaming endpoint and parse each NDJSON line into a FileInfo."""
+    response = await stream_files(folder=folder)
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    return response, [FileInfo.model_validate_json(line) for line in body.splitlines()]
 
 
 @skip_if_no_models()
@@ -104,7 +116,7 @@ class TestDataModels:
         assert parsed['files'][1]['filename'] == 'test.txt'
 
 
-@pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not available")
+@skip_if_no_main()
 class TestEndpointFunction:
     """Test the list_files endpoint function directly."""
 
@@ -132,7 +144,7 @@ class TestEndpointFunction:
             test_files.append(f"document_{i}.txt")
 
         # Call endpoint
-        result = await list_files(folder=temp_dir)
+        result = await list_files_response(folder=temp_dir)
 
         assert isinstance(result, ListFilesResponse)
         assert len(result.files) == 4
@@ -152,7 +164,7 @@ class TestEndpointFunction:
         txt_path = os.path.join(temp_dir, "test.txt")
         create_test_text_file(txt_path, "Test content")
 
-        result = await list_files(folder=temp_dir)
+        result = await list_files_response(folder=temp_dir, inline_thumbs=True)
 
         # Find image and text file in results
         image_file = next(f for f in result.files if f.filename == "test.png")
@@ -164,13 +176,28 @@ class TestEndpointFunction:
             assert image_file.thumbnail.startswith('data:image/jpeg;base64,')
         assert text_file.thumbnail is None
 
+    @pytest.mark.asyncio
+    async def test_thumbnails_are_linked_by_default(self, temp_dir):
+        """Test that images link their thumbnail instead of embedding it unless asked to."""
+        img_path = os.path.join(temp_dir, "test.png")
+        create_test_image(img_path, (100, 100), (255, 0, 0))
+        create_test_text_file(os.path.join(temp_dir, "test.txt"))
+
+        result = await list_files_response(folder=temp_dir)
+        image_file, text_file = result.files
+
+        assert image_file.thumbnail is None
+        assert image_file.thumbnail_url.startswith("/api/thumbnail?file_path=")
+        assert "&v=" in image_file.thumbnail_url
+        assert text_file.thumbnail_url is None
+
     @pytest.mark.asyncio
     async def test_empty_directory(self, temp_dir):
         """Test with empty directory."""
         empty_dir = os.path.join(temp_dir, "empty")
         os.makedirs(empty_dir)
 
-        result = await list_files(folder=empty_dir)
+        result = await list_files_response(folder=empty_dir)
 
         assert isinstance(result, ListFilesResponse)
         assert len(result.files) == 0
@@ -181,12 +208,26 @@ class TestEndpointFunction:
         img_path = os.path.join(temp_dir, "test.png")
         create_test_image(img_path, (100, 100), (255, 0, 0))
 
-        result = await list_files(folder=temp_dir)
+        result = await list_files_response(folder=temp_dir)
 
         assert len(result.files) == 1
         file_info = result.files[0]
         assert file_info.full_path == img_path
 
+    @pytest.mark.asyncio
+    async def test_subdirectories_are_skipped(self, temp_dir):
+        """Test that subdirectories are left out and images get a serve URL."""
+        os.makedirs(os.path.join(temp_dir, "folder.png"))
+        img_path = os.path.join(temp_dir, "test.png")
+        create_test_image(img_path, (100, 100), (255, 0, 0))
+        create_test_text_file(os.path.join(temp_dir, "test.txt"))
+
+        result = await list_files_response(folder=temp_dir)
+
+        assert [f.filename for f in result.files] == ["test.png", "test.txt"]
+        assert result.files[0].image_url.startswith("/api/serve-image?file_path=")
+        assert result.files[1].image_url is None
+
     @pytest.mark.asyncio
     async def test_file_sorting(self, temp_dir):
         """Test that files are returned in sorted order."""
@@ -202,13 +243,97 @@ class TestEndpointFunction:
             else:
                 create_test_image(file_path)
 
-        result = await list_files(folder=temp_dir)
+        result = await list_files_response(folder=temp_dir)
         returned_names = [f.filename for f in result.files]
 
         assert returned_names == expected_sorted
 
 
-@pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not available")
+@skip_if_no_main()
+class TestConditionalListing:
+    """Test revalidating an unchanged folder listing with its ETag."""
+
+    @pytest.mark.asyncio
+    async def test_matching_etag_returns_not_modified(self, temp_dir):
+        """Test that listing an unchanged folder with the previous ETag gets a 304."""
+        create_test_image(os.path.join(temp_dir, "test.png"))
+        etag = (await list_files(make_request("/api/list-files"), folder=temp_dir, inline_thumbs=False)).headers["etag"]
+
+        response = await list_files(make_request("/api/list-files", {"If-None-Match": etag}), folder=temp_dir, inline_thumbs=False)
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+
+    @pytest.mark.asyncio
+    async def test_changed_folder_gets_new_etag(self, temp_dir):
+        """Test that adding or rewriting a file changes the ETag."""
+        img_path = os.path.join(temp_dir, "test.png")
+        create_test_image(img_path)
+        first = (await list_files(make_request("/api/list-files"), folder=temp_dir, inline_thumbs=False)).headers["etag"]
+
+        create_test_text_file(os.path.join(temp_dir, "test.txt"))
+        added = await list_files(make_request("/api/list-files", {"If-None-Match": first}), folder=temp_dir, inline_thumbs=False)
+
+        create_test_image(img_path, (300, 300))
+        os.utime(img_path, ns=(0, 0))
+        rewritten = await list_files(make_request("/api/list-files"), folder=temp_dir, inline_thumbs=False)
+
+        assert added.status_code == 200
+        assert len({first, added.headers["etag"], rewritten.headers["etag"]}) == 3
+
+    @pytest.mark.asyncio
+    async def test_inline_thumbnails_get_own_etag(self, temp_dir):
+        """Test that the listings with and without inline thumbnails are told apart."""
+        create_test_image(os.path.join(temp_dir, "test.png"))
+        linked = await list_files(make_request("/api/list-files"), folder=temp_dir, inline_thumbs=False)
+
+        inline = await list_files(make_request("/api/list-files", {"If-None-Match": linked.headers["etag"]}),
+                                  folder=temp_dir, inline_thumbs=True)
+
+        assert inline.status_code == 200
+
+
+@skip_if_no_main()
+class TestStreamingListing:
+    """Test listing a folder as newline-delimited JSON."""
+
+    @pytest.mark.asyncio
+    async def test_files_are_streamed_one_per_line(self, temp_dir):
+        """Test that each file is sent as its own FileInfo line with image URLs for images."""
+        create_test_image(os.path.join(temp_dir, "image.png"))
+        create_test_text_file(os.path.join(temp_dir, "notes.txt"))
+        os.makedirs(os.path.join(temp_dir, "subdir"))
+
+        response, files = await stream_files_lines(temp_dir)
+        files_by_name = {file_info.filename: file_info for file_info in files}
+
+        assert response.media_type == "application/x-ndjson"
+        assert sorted(files_by_name) == ["image.png", "notes.txt"]
+        assert files_by_name["image.png"].thumbnail_url.startswith("/api/thumbnail?file_path=")
+        assert files_by_name["image.png"].image_url.startswith("/api/serve-image?file_path=")
+        assert files_by_name["notes.txt"].thumbnail_url is None
+        assert files_by_name["notes.txt"].image_url is None
+
+    @pytest.mark.asyncio
+    async def test_streamed_urls_match_listing(self, temp_dir):
+        """Test that the stream links the same thumbnails as the buffered listing."""
+        create_test_image(os.path.join(temp_dir, "test image.png"))
+
+        listed = await list_files_response(folder=temp_dir)
+        _, streamed = await stream_files_lines(temp_dir)
+
+        assert streamed == listed.files
+
+    @pytest.mark.asyncio
+    async def test_nonexistent_directory(self):
+        """Test that a missing folder fails before streaming starts."""
+        with pytest.raises(HTTPException) as exc_info:
+            await stream_files(folder="/nonexistent/directory")
+
+        assert exc_info.value.status_code == 404
+
+
+@skip_if_no_main()
 class TestErrorHandling:
     """Test error handling for the endpoint."""
 
@@ -216,7 +341,7 @@ class TestErrorHandling:
     async def test_nonexistent_directory(self):
         """Test handling of non-existent directory."""
         with pytest.raises(HTTPException) as exc_info:
-            await list_files(folder="/nonexistent/directory")
+            await list_files(make_request("/api/list-files"), folder="/nonexistent/directory")
 
         assert exc_info.value.status_code == 404
 
@@ -228,7 +353,7 @@ class TestErrorHandling:
         create_test_text_file(test_file, "test content")
 
         with pytest.raises(HTTPException) as exc_info:
-            await list_files(folder=test_file)
+            await list_files(make_request("/api/list-files"), folder=test_file)
 
         assert exc_info.value.status_code == 400
 
@@ -257,10 +382,10 @@ class TestIntegration:
         for filename, creator in files.items():
             creator()
 
-        if not FASTAPI_AVAILABLE:
-            pytest.skip("FastAPI not available")
+        if not MAIN_AVAILABLE:
+            pytest.skip("main module not available")
 
-        result = await list_files(folder=temp_dir)
+        result = await list_files_response(folder=temp_dir, inline_thumbs=True)
 
         assert len(result.files) == 4
 
@@ -275,18 +400,18 @@ class TestIntegration:
     @pytest.mark.asyncio
     async def test_thumbnail_caching_behavior(self, temp_dir):
         """Test that thumbnail caching works across multiple calls."""
-        if not FASTAPI_AVAILABLE:
-            pytest.skip("FastAPI not available")
+        if not MAIN_AVAILABLE:
+            pytest.skip("main module not available")
 
         img_path = os.path.join(temp_dir, "test.png")
         create_test_image(img_path, (200, 200), (255, 0, 0))
 
         # First call
-        result1 = await list_files(folder=temp_dir)
+        result1 = await list_files_response(folder=temp_dir, inline_thumbs=True)
         thumbnail1 = result1.files[0].thumbnail
 
         # Second call (should use cache)
-        result2 = await list_files(folder=temp_dir)
+        result2 = await list_files_response(folder=temp_dir, inline_thumbs=True)
         thumbnail2 = result2.files[0].thumbnail
 
         # Thumbnails should be identical (cached)
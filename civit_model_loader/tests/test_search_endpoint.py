@@ -0,0 +1,33 @@
+"""
+Tests for the /api/search endpoint.
+Tests passing Civitai search results through to the frontend using pytest.
+"""
+
+import json
+import pytest
+
+from conftest import MAIN_AVAILABLE, skip_if_no_main, make_json_request
+
+if MAIN_AVAILABLE:
+    from main import search_models
+    from civitai_client import CivitaiClient
+
+
+@skip_if_no_main()
+class TestSearchEndpoint:
+    """Test the model search."""
+
+    @pytest.mark.parametrize("content_type", ["application/json", "text/plain;charset=UTF-8"])
+    async def test_results_are_returned_as_json(self, monkeypatch, content_type):
+        """Test that Civitai's search results are encoded unchanged for JSON and text/plain requests."""
+        results = {"items": [{"id": 1, "name": "Model", "tags": ["anime"]}], "metadata": {"nextCursor": "abc"}}
+
+        async def search(self, search_request):
+            return results
+
+        monkeypatch.setattr(CivitaiClient, "search_models", search)
+
+        response = await search_models(make_json_request("/api/search", {"query": "model"}, content_type))
+
+        assert response.media_type == "application/json"
+        assert json.loads(response.body) == results
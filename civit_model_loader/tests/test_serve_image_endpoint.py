@@ -0,0 +1,81 @@
+"""
+Tests for the /api/serve-image endpoint.
+Tests conditional requests for full-size images using pytest.
+"""
+
+import os
+import pytest
+
+from conftest import create_test_image, MAIN_AVAILABLE, skip_if_no_main, make_request
+
+if MAIN_AVAILABLE:
+    import main
+    from main import serve_image
+    from fastapi import HTTPException
+
+
+@skip_if_no_main()
+class TestServeImage:
+    """Test serving full-size images with ETag revalidation."""
+
+    @pytest.fixture
+    def image_path(self, temp_dir):
+        path = os.path.join(temp_dir, "test.png")
+        create_test_image(path)
+        return path
+
+    async def test_image_is_served_with_etag(self, image_path):
+        """Test that the image is served with an ETag and revalidation policy."""
+        response = await serve_image(make_request("/api/serve-image"), file_path=image_path)
+
+        assert response.status_code == 200
+        assert response.media_type == "image/png"
+        assert response.headers["etag"]
+        assert response.headers["last-modified"]
+        assert response.headers["cache-control"] == "no-cache"
+
+    async def test_matching_etag_returns_not_modified(self, image_path):
+        """Test that a repeat request with the current ETag gets a 304."""
+        etag = (await serve_image(make_request("/api/serve-image"), file_path=image_path)).headers["etag"]
+
+        response = await serve_image(make_request("/api/serve-image", {"If-None-Match": etag}), file_path=image_path)
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+
+    async def test_rewritten_image_is_served_again(self, image_path):
+        """Test that an ETag from before the image was rewritten gets the new image."""
+        etag = (await serve_image(make_request("/api/serve-image"), file_path=image_path)).headers["etag"]
+        create_test_image(image_path, (300, 300))
+        os.utime(image_path, (0, 0))
+
+        response = await serve_image(make_request("/api/serve-image", {"If-None-Match": etag}), file_path=image_path)
+
+        assert response.status_code == 200
+
+    async def test_sibling_with_allowed_prefix_is_rejected(self, temp_dir, monkeypatch):
+        """Test that a directory merely starting with an allowed root's name is not allowed."""
+        allowed = os.path.join(temp_dir, "allowed")
+        os.makedirs(allowed)
+        monkeypatch.setattr(main, "ALLOWED_IMAGE_ROOTS", [os.path.realpath(allowed)])
+        sibling_image = os.path.join(temp_dir, "allowed_evil", "test.png")
+        os.makedirs(os.path.dirname(sibling_image))
+        create_test_image(sibling_image)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await serve_image(make_request("/api/serve-image"), file_path=sibling_image)
+
+        assert exc_info.value.status_code == 403
+
+    async def test_symlink_out_of_allowed_root_is_rejected(self, temp_dir, image_path, monkeypatch):
+        """Test that a link inside an allowed root cannot point at an image outside of it."""
+        allowed = os.path.join(temp_dir, "allowed")
+        os.makedirs(allowed)
+        monkeypatch.setattr(main, "ALLOWED_IMAGE_ROOTS", [os.path.realpath(allowed)])
+        link = os.path.join(allowed, "link.png")
+        os.symlink(image_path, link)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await serve_image(make_request("/api/serve-image"), file_path=link)
+
+        assert exc_info.value.status_code == 403
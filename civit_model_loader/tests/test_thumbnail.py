@@ -4,6 +4,7 @@ Tests the ThumbnailCache class and related functions using pytest.
 """
 
 import os
+import base64
 import time
 import tempfile
 import pytest
@@ -107,6 +108,27 @@ class TestThumbnailCache:
         stats = cache.get_cache_stats()
         assert stats['cache_size'] <= 2  # Should not exceed limit
 
+    def test_concurrent_requests_for_same_image(self, thumbnail_cache, test_image_path):
+        """Test that concurrent misses for one image are cached once."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            thumbnails = list(pool.map(thumbnail_cache.get_thumbnail_bytes, [test_image_path] * 4))
+
+        assert len(set(thumbnails)) == 1
+        assert thumbnails[0] is not None
+        stats = thumbnail_cache.get_cache_stats()
+        assert stats['cache_size'] == 1
+        assert stats['memory_usage_mb'] * 1024 * 1024 == len(thumbnails[0])
+
+    def test_thumbnails_are_cached_as_jpeg(self, thumbnail_cache, test_image_path):
+        """Test that the cache holds JPEG data and only encodes it for base64 callers."""
+        thumbnail = thumbnail_cache.get_thumbnail_bytes(test_image_path)
+
+        assert thumbnail.startswith(b"\xff\xd8")
+        assert thumbnail_cache.get_thumbnail_base64(test_image_path) == base64.b64encode(thumbnail).decode()
+        assert thumbnail_cache.get_cache_stats()['memory_usage_mb'] * 1024 * 1024 == len(thumbnail)
+
     def test_cache_clear(self, thumbnail_cache, test_image_path):
         """Test cache clearing functionality."""
         # Generate a thumbnail
@@ -144,6 +166,66 @@ class TestThumbnailCache:
         assert stats['memory_usage_mb'] > 0
 
 
+@skip_if_no_thumbnail()
+class TestDiskCache:
+    """Test persisting thumbnails on disk."""
+
+    def test_disk_cache_survives_new_instance(self, temp_dir, test_image_path, monkeypatch):
+        """Test that a fresh cache reads the thumbnail from disk instead of decoding the image."""
+        cache_dir = os.path.join(temp_dir, "thumb_cache")
+        thumbnail = ThumbnailCache(disk_cache_dir=cache_dir).get_thumbnail_base64(test_image_path)
+
+        fresh = ThumbnailCache(disk_cache_dir=cache_dir)
+        monkeypatch.setattr(fresh, "_create_thumbnail", lambda file_path: pytest.fail("image decoded"))
+
+        assert fresh.get_thumbnail_base64(test_image_path) == thumbnail
+        assert len(os.listdir(cache_dir)) == 1
+        with open(os.path.join(cache_dir, os.listdir(cache_dir)[0]), 'rb') as f:
+            assert base64.b64encode(f.read()).decode() == thumbnail
+
+    def test_modified_image_is_not_served_from_disk(self, temp_dir, test_image_path):
+        """Test that rewriting the image invalidates its persisted thumbnail."""
+        cache_dir = os.path.join(temp_dir, "thumb_cache")
+        thumbnail = ThumbnailCache(disk_cache_dir=cache_dir).get_thumbnail_base64(test_image_path)
+
+        create_test_image(test_image_path, (300, 100), (0, 0, 255))
+
+        assert ThumbnailCache(disk_cache_dir=cache_dir).get_thumbnail_base64(test_image_path) != thumbnail
+
+    def test_clear_removes_only_thumbnail_files(self, temp_dir, test_image_path):
+        """Test that clearing the cache leaves unrelated files in the cache directory alone."""
+        cache_dir = os.path.join(temp_dir, "thumb_cache")
+        cache = ThumbnailCache(disk_cache_dir=cache_dir)
+        cache.get_thumbnail_base64(test_image_path)
+        with open(os.path.join(cache_dir, "other.txt"), 'w') as f:
+            f.write("keep")
+
+        cache.clear_cache()
+
+        assert os.listdir(cache_dir) == ["other.txt"]
+
+    def test_disk_cache_is_pruned_to_size_limit(self, temp_dir):
+        """Test that the least recently used files are removed once the disk cache exceeds its limit."""
+        cache_dir = os.path.join(temp_dir, "thumb_cache")
+        os.makedirs(cache_dir)
+        # Left behind by an image that has since been edited
+        orphan = os.path.join(cache_dir, "orphan.thumb")
+        with open(orphan, 'w') as f:
+            f.write("x" * 10000)
+        os.utime(orphan, (0, 0))
+
+        cache = ThumbnailCache(disk_cache_dir=cache_dir)
+        cache.disk_cache_max_bytes = 10000
+        for index in range(3):
+            image_path = create_test_image(os.path.join(temp_dir, f"image_{index}.png"), (200, 200), (index, 0, 0))
+            latest = cache.get_thumbnail_base64(image_path)
+
+        sizes = [entry.stat().st_size for entry in os.scandir(cache_dir)]
+        assert not os.path.exists(orphan)
+        assert sum(sizes) <= cache.disk_cache_max_bytes
+        assert ThumbnailCache(disk_cache_dir=cache_dir).get_thumbnail_base64(image_path) == latest
+
+
 @skip_if_no_thumbnail()
 class TestErrorHandling:
     """Test error handling for various edge cases."""
@@ -0,0 +1,83 @@
+"""
+Tests for the /api/thumbnail endpoint.
+Tests serving cacheable thumbnails linked from /api/list-files using pytest.
+"""
+
+import os
+from urllib.parse import urlsplit, parse_qs
+import pytest
+
+from conftest import create_test_image, create_test_text_file, MAIN_AVAILABLE, skip_if_no_main, make_request
+
+if MAIN_AVAILABLE:
+    from main import serve_thumbnail, list_files, THUMBNAIL_CACHE_CONTROL
+    from models import ListFilesResponse
+    from fastapi import HTTPException
+
+
+async def thumbnail_query(folder):
+    """List the folder and return the query parameters of its first thumbnail URL."""
+    response = await list_files(make_request("/api/list-files"), folder=folder, inline_thumbs=False)
+    thumbnail_url = ListFilesResponse.model_validate_json(response.body).files[0].thumbnail_url
+    return {name: values[0] for name, values in parse_qs(urlsplit(thumbnail_url).query).items()}
+
+
+@skip_if_no_main()
+class TestThumbnailEndpoint:
+    """Test serving thumbnails as separate cacheable responses."""
+
+    @pytest.fixture
+    def image_path(self, temp_dir):
+        path = os.path.join(temp_dir, "test.png")
+        create_test_image(path, (300, 200), (255, 0, 0))
+        return path
+
+    async def test_versioned_thumbnail_is_immutable(self, temp_dir, image_path):
+        """Test that the URL from the listing serves a JPEG that may be cached indefinitely."""
+        query = await thumbnail_query(temp_dir)
+
+        response = await serve_thumbnail(make_request("/api/thumbnail"), **query)
+
+        assert query["file_path"] == image_path
+        assert response.status_code == 200
+        assert response.media_type == "image/jpeg"
+        assert response.body.startswith(b"\xff\xd8")
+        assert response.headers["cache-control"] == THUMBNAIL_CACHE_CONTROL
+        assert response.headers["etag"]
+
+    async def test_unversioned_thumbnail_is_revalidated(self, image_path):
+        """Test that a URL without the current version is not cached as immutable."""
+        response = await serve_thumbnail(make_request("/api/thumbnail"), file_path=image_path, v="outdated")
+
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "no-cache"
+
+    async def test_matching_etag_returns_not_modified(self, temp_dir, image_path):
+        """Test that a revalidation with the current ETag gets a 304 without a body."""
+        query = await thumbnail_query(temp_dir)
+        etag = (await serve_thumbnail(make_request("/api/thumbnail"), **query)).headers["etag"]
+
+        response = await serve_thumbnail(make_request("/api/thumbnail", {"If-None-Match": etag}), **query)
+
+        assert response.status_code == 304
+        assert response.body == b""
+
+    async def test_rewritten_image_changes_version(self, temp_dir, image_path):
+        """Test that rewriting the image yields a new thumbnail URL."""
+        before = await thumbnail_query(temp_dir)
+        create_test_image(image_path, (100, 100), (0, 0, 255))
+        os.utime(image_path, ns=(0, 0))
+
+        after = await thumbnail_query(temp_dir)
+
+        assert before["v"] != after["v"]
+
+    async def test_non_image_is_rejected(self, temp_dir):
+        """Test that files which are not images are not served."""
+        text_path = os.path.join(temp_dir, "test.txt")
+        create_test_text_file(text_path)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await serve_thumbnail(make_request("/api/thumbnail"), file_path=text_path, v=None)
+
+        assert exc_info.value.status_code == 400
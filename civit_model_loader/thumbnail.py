@@ -6,8 +6,9 @@ from typing import Optional, Dict, Tuple
 from PIL import Image, ImageOps
 import hashlib
 import time
-from threading import RLock
+from threading import Lock, RLock, get_ident
 import mimetypes
+import stat
 
 logger = logging.getLogger(__name__)
 
@@ -15,11 +16,17 @@ logger = logging.getLogger(__name__)
 SUPPORTED_IMAGE_FORMATS = {'.jpg', '.jpeg', '.png',
                            '.bmp', '.tiff', '.tif', '.webp', '.gif'}
 
+# Suffix of persisted thumbnails; clearing the cache only removes these files
+DISK_CACHE_SUFFIX = '.thumb'
+# Once the disk cache grows past its limit, the least recently used files are removed down to this share of it
+DISK_CACHE_PRUNE_RATIO = 0.8
+
 
 class ThumbnailCache:
-    """In-memory cache for image thumbnails with LRU eviction and size limits."""
+    """In-memory cache for image thumbnails with LRU eviction and size limits, optionally backed by a disk cache."""
 
-    def __init__(self, max_cache_size: int = 100, max_memory_mb: int = 50, thumbnail_size: Tuple[int, int] = (150, 150)):
+    def __init__(self, max_cache_size: int = 100, max_memory_mb: int = 50, thumbnail_size: Tuple[int, int] = (150, 150),
+                 disk_cache_dir: Optional[str] = None, disk_cache_max_mb: int = 200):
         """
         Initialize the thumbnail cache.
 
@@ -27,18 +34,27 @@ class ThumbnailCache:
             max_cache_size: Maximum number of thumbnails to cache
             max_memory_mb: Maximum memory usage in MB (approximate)
             thumbnail_size: Size of generated thumbnails (width, height)
+            disk_cache_dir: Directory to persist thumbnails in across restarts and memory evictions (disabled if None)
+            disk_cache_max_mb: Maximum size of the disk cache in MB
         """
         self.max_cache_size = max_cache_size
+        self.disk_cache_dir = disk_cache_dir
+        self.disk_cache_max_bytes = disk_cache_max_mb * 1024 * 1024
         self.max_memory_bytes = max_memory_mb * 1024 * 1024
         self.thumbnail_size = thumbnail_size
         self._cache: Dict[str, Dict] = {}
         self._access_times: Dict[str, float] = {}
         self._lock = RLock()
         self._current_memory_usage = 0
-
-    def _generate_cache_key(self, file_path: str, mtime: float) -> str:
-        """Generate a cache key based on file path and modification time."""
-        key_string = f"{file_path}:{mtime}:{self.thumbnail_size[0]}x{self.thumbnail_size[1]}"
+        # Size of the disk cache directory, unknown until it has been scanned once
+        self._disk_cache_bytes: Optional[int] = None
+        self._disk_lock = Lock()
+
+    def _generate_cache_key(self, file_path: str, file_stat: os.stat_result) -> str:
+        """Generate a cache key based on file path, modification time and size."""
+        # The format tag keeps base64 files of earlier versions from being read as JPEG data
+        key_string = (f"{file_path}:{file_stat.st_mtime_ns}:{file_stat.st_size}:"
+                      f"{self.thumbnail_size[0]}x{self.thumbnail_size[1]}:jpeg")
         return hashlib.md5(key_string.encode()).hexdigest()
 
     def _evict_lru(self):
@@ -61,6 +77,83 @@ class ThumbnailCache:
 
                 logger.debug(f"Evicted thumbnail from cache: {oldest_key}")
 
+    def _read_disk_cache(self, cache_key: str) -> Optional[bytes]:
+        """Read a thumbnail persisted by an earlier call, if any."""
+        if not self.disk_cache_dir:
+            return None
+        cache_path = os.path.join(self.disk_cache_dir, cache_key + DISK_CACHE_SUFFIX)
+        try:
+            with open(cache_path, 'rb') as f:
+                data = f.read()
+            # The modification time orders files for pruning, so mark this one as recently used
+            os.utime(cache_path)
+            return data
+        except OSError:
+            return None
+
+    def _write_disk_cache(self, cache_key: str, thumbnail_bytes: bytes):
+        """Persist a thumbnail, replacing the file atomically so readers never see partial data."""
+        if not self.disk_cache_dir:
+            return
+        cache_path = os.path.join(self.disk_cache_dir, cache_key + DISK_CACHE_SUFFIX)
+        temp_path = f"{cache_path}.{os.getpid()}.{get_ident()}.tmp"
+        try:
+            os.makedirs(self.disk_cache_dir, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(thumbnail_bytes)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Failed to write thumbnail cache file {cache_path}: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        with self._disk_lock:
+            if self._disk_cache_bytes is not None:
+                self._disk_cache_bytes += len(thumbnail_bytes)
+            if self._disk_cache_bytes is None or self._disk_cache_bytes > self.disk_cache_max_bytes:
+                self._prune_disk_cache()
+
+    def _prune_disk_cache(self):
+        """Remove the least recently used files while the disk cache is above its size limit.
+
+        Thumbnails of edited or replaced images are never looked up again, so without this
+        the directory would grow forever. Called with _disk_lock held.
+        """
+        files = []
+        try:
+            with os.scandir(self.disk_cache_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(DISK_CACHE_SUFFIX):
+                        try:
+                            file_stat = entry.stat()
+                        except OSError:
+                            continue
+                        files.append((file_stat.st_mtime_ns, file_stat.st_size, entry.path))
+        except OSError as e:
+            logger.warning(f"Failed to scan thumbnail cache directory {self.disk_cache_dir}: {e}")
+            return
+
+        total_bytes = sum(size for _, size, _ in files)
+        if total_bytes > self.disk_cache_max_bytes:
+            target_bytes = self.disk_cache_max_bytes * DISK_CACHE_PRUNE_RATIO
+            files.sort()
+            for _, size, path in files:
+                if total_bytes <= target_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Failed to remove thumbnail cache file {path}: {e}")
+                    continue
+                total_bytes -= size
+            logger.debug(f"Pruned thumbnail disk cache to {total_bytes} bytes")
+        self._disk_cache_bytes = total_bytes
+
     def _create_thumbnail(self, file_path: str) -> Optional[bytes]:
         """Create a thumbnail for the given image file."""
         try:
@@ -89,19 +182,23 @@ class ThumbnailCache:
             logger.warning(f"Failed to create thumbnail for {file_path}: {e}")
             return None
 
-    def get_thumbnail_base64(self, file_path: str) -> Optional[str]:
+    def get_thumbnail_bytes(self, file_path: str) -> Optional[bytes]:
         """
-        Get a base64-encoded thumbnail for the given image file.
+        Get the JPEG thumbnail for the given image file.
 
         Args:
             file_path: Path to the image file
 
         Returns:
-            Base64-encoded thumbnail image data or None if failed
+            JPEG thumbnail data or None if failed
         """
         try:
             # Check if file exists and is readable
-            if not os.path.isfile(file_path):
+            try:
+                file_stat = os.stat(file_path)
+            except OSError:
+                return None
+            if not stat.S_ISREG(file_stat.st_mode):
                 return None
 
             # Check if it's a supported image format
@@ -109,9 +206,8 @@ class ThumbnailCache:
             if ext not in SUPPORTED_IMAGE_FORMATS:
                 return None
 
-            # Get file modification time for cache invalidation
-            mtime = os.path.getmtime(file_path)
-            cache_key = self._generate_cache_key(file_path, mtime)
+            # Key on modification time and size for cache invalidation
+            cache_key = self._generate_cache_key(file_path, file_stat)
 
             with self._lock:
                 # Check cache first
@@ -119,42 +215,68 @@ class ThumbnailCache:
                     self._access_times[cache_key] = time.time()
                     return self._cache[cache_key]['data']
 
-                # Create thumbnail
+            # Fall back to the disk cache before decoding the image again
+            thumbnail_bytes = self._read_disk_cache(cache_key)
+            if thumbnail_bytes is None:
+                # Create thumbnail outside the lock so concurrent callers decode in parallel
                 thumbnail_bytes = self._create_thumbnail(file_path)
                 if thumbnail_bytes is None:
                     return None
+                self._write_disk_cache(cache_key, thumbnail_bytes)
 
-                # Encode to base64
-                thumbnail_base64 = base64.b64encode(
-                    thumbnail_bytes).decode('utf-8')
-
+            with self._lock:
                 # Store in cache
-                cache_item = {
-                    'data': thumbnail_base64,
-                    'size': len(thumbnail_base64),
-                    'created': time.time()
-                }
-
-                self._cache[cache_key] = cache_item
+                if cache_key not in self._cache:
+                    cache_item = {
+                        'data': thumbnail_bytes,
+                        'size': len(thumbnail_bytes),
+                        'created': time.time()
+                    }
+
+                    self._cache[cache_key] = cache_item
+                    self._current_memory_usage += cache_item['size']
                 self._access_times[cache_key] = time.time()
-                self._current_memory_usage += cache_item['size']
 
                 # Evict old items if necessary
                 self._evict_lru()
 
-                logger.debug(f"Created and cached thumbnail for {file_path}")
-                return thumbnail_base64
+            logger.debug(f"Created and cached thumbnail for {file_path}")
+            return thumbnail_bytes
 
         except Exception as e:
             logger.error(f"Error getting thumbnail for {file_path}: {e}")
             return None
 
+    def get_thumbnail_base64(self, file_path: str) -> Optional[str]:
+        """
+        Get a base64-encoded thumbnail for the given image file.
+
+        Thumbnails are cached as JPEG data and only encoded for callers that embed them.
+
+        Args:
+            file_path: Path to the image file
+
+        Returns:
+            Base64-encoded thumbnail image data or None if failed
+        """
+        thumbnail_bytes = self.get_thumbnail_bytes(file_path)
+        if thumbnail_bytes is None:
+            return None
+        return base64.b64encode(thumbnail_bytes).decode('ascii')
+
     def clear_cache(self):
         """Clear all cached thumbnails."""
         with self._lock:
             self._cache.clear()
             self._access_times.clear()
             self._current_memory_usage = 0
+            if self.disk_cache_dir and os.path.isdir(self.disk_cache_dir):
+                with os.scandir(self.disk_cache_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(DISK_CACHE_SUFFIX):
+                            os.remove(entry.path)
+                with self._disk_lock:
+                    self._disk_cache_bytes = 0
             logger.info("Thumbnail cache cleared")
 
     def get_cache_stats(self) -> Dict:
@@ -170,7 +292,9 @@ class ThumbnailCache:
 
 
 # Global thumbnail cache instance
-_thumbnail_cache = ThumbnailCache()
+_thumbnail_cache = ThumbnailCache(
+    disk_cache_dir=os.getenv("THUMBNAIL_CACHE_DIR", "/tmp/thumb_cache") or None,
+    disk_cache_max_mb=int(os.getenv("THUMBNAIL_CACHE_MAX_MB", "200")))
 
 
 def get_thumbnail_base64(file_path: str) -> Optional[str]:
@@ -188,6 +312,19 @@ def get_thumbnail_base64(file_path: str) -> Optional[str]:
     return _thumbnail_cache.get_thumbnail_base64(file_path)
 
 
+def get_thumbnail_bytes(file_path: str) -> Optional[bytes]:
+    """
+    Get the JPEG thumbnail for the given image file from the global thumbnail cache.
+
+    Args:
+        file_path: Path to the image file
+
+    Returns:
+        JPEG thumbnail data or None if failed/not an image
+    """
+    return _thumbnail_cache.get_thumbnail_bytes(file_path)
+
+
 def is_image_file(file_path: str) -> bool:
     """
     Check if a file is a supported image format.